@@ -0,0 +1,183 @@
+"""
+In-memory sorted name index for typeahead suggestions
+"""
+import heapq
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List
+
+from search_index import prefix_upper_bound
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched at a time while loading the index
+LOAD_BATCH_SIZE = 50_000
+
+# Prefix ranges up to this size are ranked directly; larger ones (short
+# prefixes) are answered by walking all names in importance order instead,
+# which reaches `limit` in-range names after about limit * len / range steps
+RANK_WINDOW = 5_000
+
+
+class _PackedStrings:
+    """Read-only sequence of strings stored as one UTF-8 buffer plus offsets
+
+    Far smaller than a list of str objects, and slicing the buffer is O(1), so
+    it can be bisected directly. UTF-8 byte order matches code point order,
+    which is how DuckDB sorts VARCHAR.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._buffer = b""
+        self._offsets = array("Q", [0])
+
+    def append(self, value: str):
+        encoded = value.encode()
+        self._chunks.append(encoded)
+        self._size += len(encoded)
+        self._offsets.append(self._size)
+
+    def freeze(self):
+        """Join the appended chunks into the final buffer"""
+        self._buffer = b"".join(self._chunks)
+        self._chunks = []
+
+    def raw(self, index: int) -> bytes:
+        return self._buffer[self._offsets[index] : self._offsets[index + 1]]
+
+    def __getitem__(self, index: int) -> str:
+        return self.raw(index).decode()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+
+class _RawKeys:
+    """bytes view of packed keys for bisect, without decoding them"""
+
+    def __init__(self, strings: _PackedStrings):
+        self._strings = strings
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._strings.raw(index)
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+class NameIndex:
+    """Division names sorted by name_upper, answering prefix lookups by bisection"""
+
+    def __init__(self):
+        self.keys = _PackedStrings()
+        self.names = _PackedStrings()
+        self.ids = _PackedStrings()
+        self.subtype_codes = array("B")
+        self.importance = array("f")
+        self.subtypes: List[str] = []
+        self._subtype_codes: Dict[str, int] = {}
+        # Positions of all names, most important first
+        self.by_importance = array("I")
+
+    @classmethod
+    def load(cls, db) -> "NameIndex":
+        """Read every division name from divisions_index, already sorted"""
+        start = time.monotonic()
+        index = cls()
+        result = db.execute(
+            """
+            SELECT name_upper, name, id, subtype, importance
+            FROM divisions_index
+            ORDER BY name_upper
+        """
+        )
+        while True:
+            rows = result.fetchmany(LOAD_BATCH_SIZE)
+            if not rows:
+                break
+            for name_upper, name, division_id, subtype, importance in rows:
+                index._append(name_upper, name, division_id, subtype, importance)
+        for strings in (index.keys, index.names, index.ids):
+            strings.freeze()
+        # Ties are broken by a multiplicative hash of the position rather than
+        # the position itself, so equally important names of one prefix are
+        # spread through the order instead of clustered at one point
+        index.by_importance = array(
+            "I",
+            sorted(
+                range(len(index)),
+                key=lambda position: (
+                    index.importance[position],
+                    (position * 2654435761) & 0xFFFFFFFF,
+                ),
+                reverse=True,
+            ),
+        )
+        logger.info(
+            f"Loaded {len(index)} names for autocomplete in {time.monotonic() - start:.1f}s"
+        )
+        return index
+
+    def _append(
+        self,
+        name_upper: str,
+        name: str,
+        division_id: str,
+        subtype: str,
+        importance: float,
+    ):
+        subtype = subtype or ""
+        code = self._subtype_codes.get(subtype)
+        if code is None:
+            code = self._subtype_codes[subtype] = len(self.subtypes)
+            self.subtypes.append(subtype)
+        self.keys.append(name_upper)
+        self.names.append(name)
+        self.ids.append(division_id)
+        self.subtype_codes.append(code)
+        self.importance.append(importance or 0.0)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top names starting with prefix: exact matches first, then by importance"""
+        prefix_upper = prefix.upper()
+        if not prefix_upper:
+            return []
+        low_key = prefix_upper.encode()
+        high_key = prefix_upper_bound(prefix_upper).encode()
+        raw_keys = _RawKeys(self.keys)
+        low = bisect_left(raw_keys, low_key)
+        high = bisect_left(raw_keys, high_key, low)
+        # Exact matches sort first within the prefix range
+        exact_high = bisect_right(raw_keys, low_key, low, high)
+
+        by_importance = self.importance.__getitem__
+        positions = heapq.nlargest(limit, range(low, exact_high), key=by_importance)
+        if len(positions) < limit:
+            remaining = limit - len(positions)
+            if high - exact_high <= RANK_WINDOW:
+                positions += heapq.nlargest(
+                    remaining, range(exact_high, high), key=by_importance
+                )
+            else:
+                for position in self.by_importance:
+                    if exact_high <= position < high:
+                        positions.append(position)
+                        remaining -= 1
+                        if not remaining:
+                            break
+
+        return [
+            {
+                "id": self.ids[position],
+                "name": self.names[position],
+                "subtype": self.subtypes[self.subtype_codes[position]],
+            }
+            for position in positions
+        ]
@@ -1,13 +1,57 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import (
+    Flask,
+    Response,
+    request,
+    jsonify,
+    send_from_directory,
+    stream_with_context,
+)
 from flask_cors import CORS
 import duckdb
 import json
+import math
 import os
-import requests
+import shutil
+import threading
+import time
 import urllib.parse
-from typing import List, Dict, Any, Optional
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import logging
 
+from autocomplete import NameIndex
+from build_index import DEFAULT_SOURCE
+from cache import MISSING, ResponseCache
+from compression import compress_response
+from db_pool import ConnectionPool, PoolTimeout
+from export import (
+    EXPORT_FORMATS,
+    copy_options,
+    export_path,
+    stream_file,
+    write_geojson,
+)
+import metrics
+from nominatim import NominatimClient
+from prefetch import DEFAULT_VIEWPORT_PIXELS, GeometryPrefetcher, fit_zoom
+from search_index import (
+    SEARCH_MODES,
+    SEARCH_RANKINGS,
+    name_source,
+    prefix_upper_bound,
+    relevance_score,
+)
+from single_flight import Overloaded, SingleFlight
+from spatial_index import SpatialStats, prefer_spatial, spatial_source
+from tiles import (
+    TileStore,
+    encode_tile,
+    filters_from_types,
+    max_grid_level,
+    tile_bounds,
+    tiles_available,
+)
+
 app = Flask(__name__)
 CORS(app)
 
@@ -15,40 +59,399 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Remote Overture division_area parquet, only read when the S3 fallback is
+# enabled. Overrides the source the index was built from.
+OVERTURE_DIVISION_AREA_SOURCE = os.environ.get("OVERTURE_SOURCE")
+
+CONFIG_PATH = os.environ.get("CONFIG_PATH", "./config.json")
+
+# Simplification tolerance (degrees) used when no zoom or tolerance is requested
+DEFAULT_SIMPLIFY_TOLERANCE = 0.00001
+
+# Default and maximum number of autocomplete suggestions
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 20
+
+# Upper bound on ids per batch geometry request
+MAX_BATCH_IDS = 500
+
+# Ids queried, or rows fetched, at a time while streaming batch geometry results
+BATCH_FETCH_SIZE = 100
+
+# Deepest zoom served by the vector tile endpoint
+MAX_TILE_ZOOM = 16
+
+# Upper bound on divisions drawn in one vector tile, largest first
+MAX_TILE_FEATURES = 5000
+
+# Upper bound on divisions in one export; larger exports are refused with a 413
+MAX_EXPORT_FEATURES = int(os.environ.get("EXPORT_MAX_FEATURES", 100_000))
+
+# Upper bound on points per batch reverse lookup
+MAX_REVERSE_POINTS = 500
+
+# Upper bound on children listed per request
+MAX_CHILDREN = 1000
+
+# Overture division subtypes from the broadest to the most local, used to
+# order the divisions containing a point; unknown subtypes sort last
+SUBTYPE_ORDER = (
+    "country",
+    "dependency",
+    "macroregion",
+    "region",
+    "macrocounty",
+    "county",
+    "localadmin",
+    "locality",
+    "borough",
+    "macrohood",
+    "neighborhood",
+    "microhood",
+)
+
+# Default geometry returned when a division cannot be resolved
+WORLD_BBOX_GEOMETRY = {
+    "type": "Polygon",
+    "coordinates": [[[-180, -90], [180, -90], [180, 90], [-180, 90], [-180, -90]]],
+}
+WORLD_BBOX_GEOMETRY_JSON = json.dumps(WORLD_BBOX_GEOMETRY)
+
+# Search result fields, in the order SEARCH_RESULT_COLUMNS selects them.
+# Population is not available in divisions data and geometry is fetched
+# separately, so both are added as None.
+SEARCH_RESULT_FIELDS = ("id", "name", "type", "region", "country", "admin_level", "bbox")
+SEARCH_RESULT_COLUMNS = """
+    id,
+    COALESCE(name, common_name, 'Unknown') AS name,
+    CASE
+        WHEN subtype = 'locality' THEN 'city'
+        WHEN subtype = 'county' THEN 'county'
+        WHEN subtype IN ('region', 'country') THEN 'state'
+        ELSE 'region'
+    END AS type,
+    -- "<state>, <country>" from the hierarchy built by build_index.py
+    COALESCE(region_label, country, 'Unknown') AS region,
+    COALESCE(country, 'Unknown') AS country,
+    -- A reasonable admin level for compatibility with OSM-style results
+    CASE subtype
+        WHEN 'locality' THEN 8
+        WHEN 'county' THEN 6
+        WHEN 'region' THEN 4
+        WHEN 'country' THEN 2
+        ELSE 0
+    END AS admin_level,
+    bbox
+"""
+
+
+def env_flag(name: str) -> bool:
+    """Read a boolean feature flag from the environment"""
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def load_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    """Load the shared app configuration, returning an empty config if unavailable"""
+    try:
+        with open(path) as config_file:
+            return json.load(config_file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load config from {path}: {e}")
+        return {}
+
+
+def subtype_condition(filters: Dict[str, bool]) -> Optional[str]:
+    """SQL condition for the city/state/county filters, or None when all are on"""
+    if (
+        filters.get("city", True)
+        and filters.get("state", True)
+        and filters.get("county", True)
+    ):
+        return None
+
+    subtype_conditions = []
+    if filters.get("city", True):
+        subtype_conditions.append("subtype = 'locality'")
+    if filters.get("state", True):
+        subtype_conditions.append("subtype IN ('region', 'country')")
+    if filters.get("county", True):
+        subtype_conditions.append("subtype = 'county'")
+
+    if not subtype_conditions:
+        return None
+    return f"({' OR '.join(subtype_conditions)})"
+
+
+def subtype_rank(subtype: Optional[str]) -> int:
+    """Position of a subtype in SUBTYPE_ORDER, broadest first"""
+    try:
+        return SUBTYPE_ORDER.index(subtype)
+    except ValueError:
+        return len(SUBTYPE_ORDER)
+
+
+def zoom_to_tolerance(zoom: float) -> float:
+    """Width of one 256px web map tile pixel in degrees at the given zoom"""
+    return 360.0 / (256 * 2 ** max(zoom, 0))
+
 
 class OvertureDataService:
-    def __init__(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None, connect: bool = True):
         self.db = None
-        self.setup_database()
+        self.pool: Optional[ConnectionPool] = None
+        # Cursors for the geometry and prefetch worker threads, kept apart so
+        # slow reads never hold the cursors request threads need
+        self.geometry_pool: Optional[ConnectionPool] = None
+        # Cursors for writing exports, so large exports never hold request cursors
+        self.export_pool: Optional[ConnectionPool] = None
+        data_config = (config or {}).get("data", {})
+        self.cache = ResponseCache(
+            max_bytes=int(data_config.get("cacheMaxMegabytes", 256) * 1024 * 1024),
+            ttl_seconds=float(data_config.get("cacheExpiryHours", 24)) * 3600,
+            enabled=bool(data_config.get("cacheResults", False)),
+        )
+        self.has_geometry_store = False
+        self.has_terms_index = False
+        self.has_hierarchy = False
+        tile_store_dir = os.environ.get("TILE_STORE_DIR")
+        self.tile_store = TileStore(tile_store_dir) if tile_store_dir else None
+        self.spatial_stats: Optional[SpatialStats] = None
+        # Loaded in the background after connecting; autocomplete queries the
+        # index until it is ready
+        self.name_index: Optional[NameIndex] = None
+        self.autocomplete_in_memory = not env_flag("AUTOCOMPLETE_SQL_ONLY")
+        # (lod, tolerance) pairs of the precomputed geometry pyramid, finest first
+        self.geometry_lods: List[Tuple[int, float]] = []
+        # Reading geometry from the S3 glob is a full remote scan, so it is opt-in
+        self.s3_fallback = env_flag("OVERTURE_S3_FALLBACK")
+        # Geometry fetches run on a bounded pool, identical concurrent fetches
+        # share one call, and request threads stop waiting after the timeout;
+        # past GEOMETRY_MAX_WAITING waiting threads, requests get a 503 at once
+        self.geometry_flights = SingleFlight(
+            workers=int(os.environ.get("GEOMETRY_WORKERS", 4)),
+            max_pending=int(os.environ.get("GEOMETRY_MAX_PENDING", 64)),
+            max_waiting=int(os.environ.get("GEOMETRY_MAX_WAITING", 2)),
+        )
+        self.geometry_timeout = float(os.environ.get("GEOMETRY_TIMEOUT", 10))
+        # Opt-in: geometries of the first PREFETCH_GEOMETRIES search results
+        # are fetched into the cache in the background
+        self.prefetcher = GeometryPrefetcher(
+            self._fetch_geometry_json,
+            lambda key: key in self.cache,
+            count=int(os.environ.get("PREFETCH_GEOMETRIES", 0)) if self.cache.enabled else 0,
+            workers=int(os.environ.get("PREFETCH_WORKERS", 1)),
+            max_pending=int(os.environ.get("PREFETCH_MAX_PENDING", 20)),
+        )
+        self.nominatim = NominatimClient.from_env()
+        # Overture release and source of the index, read from its metadata
+        self.release: Optional[str] = None
+        self.source = OVERTURE_DIVISION_AREA_SOURCE or DEFAULT_SOURCE
+        # Fast start skips extension installs and the row count scan at boot,
+        # and only sets up httpfs once a remote read actually happens
+        self.fast_start = env_flag("OVERTURE_FAST_START")
+        self.httpfs_ready = False
+        self._httpfs_lock = threading.Lock()
+        # The production server connects in each worker after forking instead
+        if connect:
+            self.setup_database()
 
     def setup_database(self):
         """Initialize DuckDB connection with persistent database and indexes"""
+        phase_start = setup_start = time.monotonic()
+        phase_timings = {}
+
+        def end_phase(name: str):
+            nonlocal phase_start
+            now = time.monotonic()
+            phase_timings[name] = now - phase_start
+            phase_start = now
+
         try:
             # Use persistent database file
             db_path = os.environ.get("DUCKDB_PATH", "./divisions_index.duckdb")
-            self.db = duckdb.connect(db_path)
+            # Read-only connections let several worker processes open the same
+            # file and share it through the OS page cache
+            self.db = duckdb.connect(db_path, read_only=env_flag("DUCKDB_READ_ONLY"))
+            end_phase("connect")
+
+            # Spatial extension for geometry operations
+            self._load_extension("spatial")
+            # Overture geometry is read as the WKB it is stored as and decoded
+            # with ST_GeomFromWKB, rather than converted to GEOMETRY on read
+            self.db.execute("SET GLOBAL enable_geoparquet_conversion = false;")
+
+            # httpfs is only needed for remote reads, so fast start defers it
+            if not self.fast_start:
+                self._setup_httpfs()
+            end_phase("extensions")
+
+            # Verify the pre-built index table exists
+            self._verify_divisions_index()
+            if self._table_exists("index_metadata"):
+                metadata = self.index_metadata()
+                self.release = metadata.get("release")
+                if not OVERTURE_DIVISION_AREA_SOURCE and metadata.get("source"):
+                    self.source = metadata["source"]
+            logger.info(f"Index built from release {self.release or 'unknown'} ({self.source})")
+            end_phase("verify_index")
+
+            self.has_terms_index = self._table_exists("divisions_name_terms")
+            if not self.has_terms_index:
+                logger.warning(
+                    "No word-prefix name index found, word searches will scan the index"
+                )
 
-            # Install spatial extension for geometry operations
-            self.db.execute("INSTALL spatial;")
-            self.db.execute("LOAD spatial;")
+            self.has_hierarchy = self._table_exists("division_children")
+            if not self.has_hierarchy:
+                logger.warning(
+                    "No division hierarchy found, children and ancestor lookups are unavailable"
+                )
+
+            if self._table_exists("divisions_spatial"):
+                self.spatial_stats = SpatialStats.load(self.db)
+            else:
+                logger.warning(
+                    "No spatial index found, viewport filters will scan the index"
+                )
 
-            # Install httpfs for reading remote parquet files
-            self.db.execute("INSTALL httpfs;")
-            self.db.execute("LOAD httpfs;")
+            self.has_geometry_store = self._table_exists("division_geometry")
+            if self.has_geometry_store:
+                logger.info("Serving geometry from local division_geometry store")
+                if self._table_exists("division_geometry_lod_levels"):
+                    self.geometry_lods = self.db.execute(
+                        "SELECT lod, tolerance FROM division_geometry_lod_levels ORDER BY lod"
+                    ).fetchall()
+                    logger.info(
+                        f"Using precomputed geometry levels: {self.geometry_lods}"
+                    )
+            elif self.s3_fallback:
+                logger.warning(
+                    "No local geometry store found, geometry will be read from S3"
+                )
+            else:
+                logger.warning(
+                    "No local geometry store found and S3 fallback is disabled"
+                )
 
-            # Configure AWS settings for accessing Overture data
-            self.db.execute("SET s3_region='us-west-2';")
-            self.db.execute("SET s3_access_key_id='';")
-            self.db.execute("SET s3_secret_access_key='';")
+            end_phase("load_index_stats")
 
-            # Verify the pre-built index table exists
-            self._verify_divisions_index()
+            # Request threads each check out their own cursor from the pool
+            self.pool = ConnectionPool(
+                self.db,
+                size=int(os.environ.get("DUCKDB_POOL_SIZE", 4)),
+                timeout=float(os.environ.get("DUCKDB_POOL_TIMEOUT", 10)),
+            )
+            # One cursor per geometry and prefetch worker, so workers never wait
+            self.geometry_pool = ConnectionPool(
+                self.db,
+                size=self.geometry_flights.workers + self.prefetcher.flights.workers,
+                timeout=float(os.environ.get("DUCKDB_POOL_TIMEOUT", 10)),
+            )
+            self.export_pool = ConnectionPool(
+                self.db,
+                size=int(os.environ.get("EXPORT_POOL_SIZE", 2)),
+                timeout=float(os.environ.get("EXPORT_POOL_TIMEOUT", 1)),
+            )
+            end_phase("pool")
+
+            if self.autocomplete_in_memory:
+                threading.Thread(
+                    target=self._load_name_index, name="name-index-loader", daemon=True
+                ).start()
 
             logger.info("Database setup with pre-built indexing completed successfully")
+            logger.info(
+                f"Startup phases (fast start: {self.fast_start}): "
+                + ", ".join(
+                    f"{name}={seconds * 1000:.0f}ms"
+                    for name, seconds in phase_timings.items()
+                )
+                + f", total={(time.monotonic() - setup_start) * 1000:.0f}ms"
+            )
         except Exception as e:
             logger.error(f"Database setup failed: {e}")
             # Don't raise the exception, just log it and continue with mock data
             self.db = None
+            self.pool = None
+            self.geometry_pool = None
+            self.export_pool = None
+
+    def _load_name_index(self):
+        """Build the in-memory autocomplete index from divisions_index"""
+        try:
+            cursor = self.db.cursor()
+            try:
+                self.name_index = NameIndex.load(cursor)
+            finally:
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Loading the autocomplete name index failed: {e}")
+
+    def _load_extension(self, name: str):
+        """Load a DuckDB extension, installing it first unless fast start is on"""
+        if self.fast_start:
+            try:
+                # Extensions are installed into the image when the index is built
+                self.db.execute(f"LOAD {name};")
+                return
+            except duckdb.Error as e:
+                logger.warning(f"Could not load pre-installed {name} extension: {e}")
+        self.db.execute(f"INSTALL {name};")
+        self.db.execute(f"LOAD {name};")
+
+    def _setup_httpfs(self):
+        """Load httpfs and the S3 settings for reading remote Overture parquet files"""
+        with self._httpfs_lock:
+            if self.httpfs_ready:
+                return
+            start = time.monotonic()
+            self._load_extension("httpfs")
+
+            # Configure AWS settings for accessing Overture data, globally so
+            # pooled cursors inherit them
+            self.db.execute("SET GLOBAL s3_region='us-west-2';")
+            self.db.execute("SET GLOBAL s3_access_key_id='';")
+            self.db.execute("SET GLOBAL s3_secret_access_key='';")
+            self.httpfs_ready = True
+            logger.info(f"httpfs set up in {(time.monotonic() - start) * 1000:.0f}ms")
+
+    def warm_up(self):
+        """Run a first search and geometry lookup so the first user request is not cold"""
+        if not self.db:
+            logger.warning("Skipping warm-up, database connection not available")
+            return
+        start = time.monotonic()
+        try:
+            with self.pool.connection() as conn:
+                sample = conn.execute(
+                    "SELECT id, name FROM divisions_index LIMIT 1"
+                ).fetchone()
+            if sample:
+                self._query_overture_data(sample[1][:3], {}, None, "prefix")
+                if self.has_geometry_store:
+                    self._query_local_geometry(sample[0])
+            logger.info(f"Warm-up completed in {time.monotonic() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+
+    def _table_exists(self, table_name: str) -> bool:
+        """Check whether a table exists in the index database"""
+        return (
+            self.db.execute(
+                """
+                SELECT COUNT(*) FROM information_schema.tables 
+                WHERE table_name = ?
+            """,
+                [table_name],
+            ).fetchone()[0]
+            > 0
+        )
+
+    def index_metadata(self) -> Dict[str, str]:
+        """Key/value facts recorded by build_index.py"""
+        return dict(
+            self.db.execute("SELECT key, value FROM index_metadata").fetchall()
+        )
 
     def _verify_divisions_index(self):
         """Verify the pre-built divisions index table exists"""
@@ -58,22 +461,20 @@ class OvertureDataService:
                 raise Exception("Database connection not available")
 
             # Check if index table exists
-            table_exists = self.db.execute(
-                """
-                SELECT COUNT(*) FROM information_schema.tables 
-                WHERE table_name = 'divisions_index'
-            """
-            ).fetchone()[0]
-
-            if table_exists == 0:
+            if not self._table_exists("divisions_index"):
                 raise Exception(
                     "Pre-built divisions index table not found! The Docker image should contain a pre-built index."
                 )
             else:
-                # Log the number of entries in the pre-built index
-                row_count = self.db.execute(
-                    "SELECT COUNT(*) FROM divisions_index"
-                ).fetchone()[0]
+                # Log the number of entries in the pre-built index, from the
+                # build metadata when fast start is on to avoid counting rows
+                row_count = None
+                if self.fast_start and self._table_exists("index_metadata"):
+                    row_count = self.index_metadata().get("row_count")
+                if row_count is None:
+                    row_count = self.db.execute(
+                        "SELECT COUNT(*) FROM divisions_index"
+                    ).fetchone()[0]
                 logger.info(f"Using pre-built divisions index with {row_count} entries")
 
         except Exception as e:
@@ -85,12 +486,31 @@ class OvertureDataService:
         query: str,
         filters: Dict[str, bool],
         bbox: Optional[Dict[str, float]] = None,
+        mode: str = "scan",
+        ranking: str = "name",
     ) -> List[Dict[str, Any]]:
         """Search for divisions in Overture Maps data"""
+        cache_key = (
+            "search",
+            mode,
+            ranking,
+            query.upper(),
+            tuple(sorted(filters.items())),
+            tuple(sorted(bbox.items())) if bbox else None,
+        )
+        metrics.label("bbox", bbox is not None)
+        cached = self.cache.get(cache_key)
+        metrics.label("cache", "miss" if cached is MISSING else "hit")
+        if cached is not MISSING:
+            logger.info(f"Serving {len(cached)} cached results for '{query}'")
+            return cached
+
         try:
             # Query actual Overture Maps data only - no mock data fallback
-            results = self._query_overture_data(query, filters, bbox)
+            results = self._query_overture_data(query, filters, bbox, mode, ranking)
             logger.info(f"Found {len(results)} results from Overture Maps data")
+            # Only Overture results are cached, fallback results are not authoritative
+            self.cache.set(cache_key, results)
             return results
 
         except Exception as e:
@@ -109,6 +529,8 @@ class OvertureDataService:
         query: str,
         filters: Dict[str, bool],
         bbox: Optional[Dict[str, float]] = None,
+        mode: str = "scan",
+        ranking: str = "name",
     ) -> List[Dict[str, Any]]:
         """Query indexed divisions data for fast searches"""
         try:
@@ -116,23 +538,29 @@ class OvertureDataService:
             if not self.db:
                 raise Exception("Database connection not available")
 
-            # Use indexed table for much faster queries
-            metadata_query = """
-            SELECT 
-                id,
-                name,
-                subtype,
-                common_name,
-                country,
+            # Drive the query from whichever of the viewport and name filters is
+            # expected to keep fewer rows
+            use_spatial_index = bool(
                 bbox
-            FROM divisions_index
-            WHERE name_upper LIKE ?
+                and self.spatial_stats
+                and prefer_spatial(self.spatial_stats, query, bbox)
+            )
+            if use_spatial_index:
+                source, params = spatial_source(query, mode, bbox)
+                logger.info(f"Applying spatial filter via spatial index: {bbox}")
+            else:
+                source, params = name_source(query, mode, self.has_terms_index)
+
+            # Results are shaped entirely in SQL, so Python only zips rows
+            # with SEARCH_RESULT_FIELDS instead of mapping each row itself
+            metadata_query = f"""
+            SELECT {SEARCH_RESULT_COLUMNS}
+            FROM {source}
+            WHERE TRUE
             """
 
-            params = [f"%{query.upper()}%"]
-
             # Add spatial filtering if bbox is provided
-            if bbox:
+            if bbox and not use_spatial_index:
                 # Convert bbox to spatial filter - check if the feature's bbox intersects with the viewport bbox
                 metadata_query += """
                 AND bbox IS NOT NULL
@@ -147,71 +575,32 @@ class OvertureDataService:
                 logger.info(f"Applying spatial filter: {bbox}")
 
             # Add simple subtype filters
-            if not (
-                filters.get("city", True)
-                and filters.get("state", True)
-                and filters.get("county", True)
-            ):
-                subtype_conditions = []
-                if filters.get("city", True):
-                    subtype_conditions.append("subtype = 'locality'")
-                if filters.get("state", True):
-                    subtype_conditions.append("subtype IN ('region', 'country')")
-                if filters.get("county", True):
-                    subtype_conditions.append("subtype = 'county'")
-
-                if subtype_conditions:
-                    metadata_query += f" AND ({' OR '.join(subtype_conditions)})"
-
-            metadata_query += " ORDER BY name LIMIT 20"
+            subtype_filter = subtype_condition(filters)
+            if subtype_filter:
+                metadata_query += f" AND {subtype_filter}"
+
+            if ranking == "relevance":
+                # ORDER BY ... LIMIT runs as a top-k heap over the candidates,
+                # so the full match set is never sorted
+                score, score_params = relevance_score(query, bbox)
+                metadata_query += f" ORDER BY {score} DESC, name LIMIT 20"
+                params.extend(score_params)
+            else:
+                metadata_query += " ORDER BY name LIMIT 20"
 
             logger.info(
-                f"Executing indexed query for '{query}' with spatial filter: {bbox is not None}"
+                f"Executing indexed query for '{query}' (mode: {mode}, ranking: {ranking}) with spatial filter: {bbox is not None}"
             )
 
             # Execute the parameterized query
-            metadata_results = self.db.execute(metadata_query, params).fetchall()
-
-            # Convert results to the expected format
-            formatted_results = []
-            for row in metadata_results:
-                try:
-                    # Determine type based on subtype
-                    subtype = row[2] or ""
-
-                    if subtype == "locality":
-                        type_name = "city"
-                    elif subtype == "county":
-                        type_name = "county"
-                    elif subtype in ["region", "country"]:
-                        type_name = "state"
-                    else:
-                        type_name = "region"
-
-                    # Map subtype to a reasonable admin level for compatibility
-                    admin_level_map = {
-                        "locality": 8,
-                        "county": 6,
-                        "region": 4,
-                        "country": 2,
-                    }
-                    admin_level = admin_level_map.get(subtype, 0)
+            with self.pool.connection() as conn:
+                metadata_results = metrics.timed_fetch(conn, metadata_query, params)
 
-                    # Create result without geometry initially
-                    formatted_result = {
-                        "id": row[0] or f"overture_{len(formatted_results)}",
-                        "name": row[1] or row[3] or "Unknown",
-                        "type": type_name,
-                        "region": f"{row[4] or 'Unknown'}",
-                        "country": row[4] or "Unknown",
-                        "admin_level": admin_level,
-                        "population": None,  # Population not available in divisions data
-                        "geometry": None,  # Will be fetched separately if needed
-                    }
-                    formatted_results.append(formatted_result)
-                except Exception as row_error:
-                    logger.warning(f"Error processing metadata row: {row_error}")
-                    continue
+            with metrics.span("format"):
+                formatted_results = [
+                    dict(zip(SEARCH_RESULT_FIELDS, row), population=None, geometry=None)
+                    for row in metadata_results
+                ]
 
             logger.info(
                 f"Successfully processed {len(formatted_results)} metadata results from Overture Maps"
@@ -222,45 +611,707 @@ class OvertureDataService:
             logger.error(f"Overture Maps metadata query failed: {e}")
             raise
 
-    def get_division_geometry(self, division_id: str) -> dict:
-        """PHASE 2: Fetch geometry for a specific division ID directly from Overture data"""
+    def autocomplete(
+        self, prefix: str, limit: int = AUTOCOMPLETE_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """id/name/subtype of the most important divisions whose name starts with prefix"""
+        if self.name_index is not None:
+            return self.name_index.suggest(prefix, limit)
+
+        if not self.db:
+            raise Exception("Database connection not available")
+        prefix_upper = prefix.upper()
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, name, subtype FROM divisions_index
+                WHERE name_upper >= ? AND name_upper < ?
+                ORDER BY name_upper = ? DESC, importance DESC
+                LIMIT ?
+                """,
+                [prefix_upper, prefix_upper_bound(prefix_upper), prefix_upper, limit],
+            ).fetchall()
+        return [
+            {"id": division_id, "name": name, "subtype": subtype}
+            for division_id, name, subtype in rows
+        ]
+
+    def get_division_geometry(
+        self, division_id: str, tolerance: Optional[float] = None
+    ) -> dict:
+        """PHASE 2: Fetch geometry for a specific division ID from the local store"""
+        return json.loads(self.get_division_geometry_json(division_id, tolerance))
+
+    def get_division_geometry_json(
+        self, division_id: str, tolerance: Optional[float] = None
+    ) -> str:
+        """Geometry as the GeoJSON text produced by ST_AsGeoJSON, never decoded
+
+        Raises FutureTimeout when the fetch takes longer than the geometry
+        timeout and Overloaded when too many fetches are already pending.
+        """
         try:
             if not self.db:
                 raise Exception("Database connection not available")
 
-            # Query for specific geometry directly from Overture parquet files
-            geometry_query = """
-            SELECT 
-                ST_AsGeoJSON(ST_Simplify(ST_GeomFromWKB(geometry), 0.00001)) as geometry_json
-            FROM read_parquet('s3://overturemaps-us-west-2/release/2025-06-25.0/theme=divisions/type=division_area/*.parquet')
-            WHERE id = ?
-            LIMIT 1
-            """
-
-            logger.info(f"Fetching simplified geometry for division: {division_id}")
-
-            result = self.db.execute(geometry_query, [division_id]).fetchone()
+            cache_key = self._geometry_cache_key(division_id, tolerance)
+            cached = self.cache.get(cache_key)
+            metrics.label("cache", "miss" if cached is MISSING else "hit")
+            if cached is not MISSING:
+                self.prefetcher.claim(cache_key)
+                return cached
+
+            with self.geometry_flights.waiter():
+                # Wait on a prefetch of this geometry rather than fetching it twice
+                future = self.prefetcher.in_flight(cache_key)
+                if future is not None:
+                    metrics.label("cache", "prefetching")
+                else:
+                    future = self.geometry_flights.submit(
+                        cache_key, self._fetch_geometry_json, division_id, tolerance, cache_key
+                    )
+                try:
+                    geometry_json = future.result(timeout=self.geometry_timeout)
+                except FutureTimeout:
+                    self.geometry_flights.record_timeout()
+                    logger.warning(
+                        f"Geometry fetch for {division_id} exceeded {self.geometry_timeout}s"
+                    )
+                    raise
 
-            if result and result[0]:
-                return json.loads(result[0])
-            else:
-                # Return a default bounding box if geometry not found
-                return {
-                    "type": "Polygon",
-                    "coordinates": [
-                        [[-180, -90], [180, -90], [180, 90], [-180, 90], [-180, -90]]
-                    ],
-                }
+            self.prefetcher.claim(cache_key)
+            # Return a default bounding box if geometry not found
+            return geometry_json or WORLD_BBOX_GEOMETRY_JSON
 
+        except (FutureTimeout, Overloaded):
+            raise
         except Exception as e:
             logger.error(f"Geometry fetch failed for {division_id}: {e}")
             # Return a default bounding box on error
-            return {
-                "type": "Polygon",
-                "coordinates": [
-                    [[-180, -90], [180, -90], [180, 90], [-180, 90], [-180, -90]]
-                ],
-            }
+            return WORLD_BBOX_GEOMETRY_JSON
+
+    def prefetch_geometries(
+        self, results: List[Dict[str, Any]], viewport: Optional[Dict[str, int]] = None
+    ):
+        """Start fetching the first results' geometries at the level the map will ask for
+
+        The frontend requests each geometry at the zoom that fits its bbox
+        into the map, so the same zoom, and therefore the same cache key, is
+        worked out here from the bbox and the map's pixel size.
+        """
+        if not (self.prefetcher.enabled and self.has_geometry_store):
+            return
+        if viewport:
+            size = (int(viewport["width"]), int(viewport["height"]))
+        else:
+            size = DEFAULT_VIEWPORT_PIXELS
+        jobs = []
+        for result in results:
+            # Nominatim results carry their geometry and are not in the store
+            if result.get("geometry") is not None or not result.get("bbox"):
+                continue
+            tolerance = zoom_to_tolerance(fit_zoom(result["bbox"], size))
+            jobs.append(
+                (self._geometry_cache_key(result["id"], tolerance), result["id"], tolerance)
+            )
+        self.prefetcher.schedule(jobs)
+
+    def _fetch_geometry_json(
+        self, division_id: str, tolerance: Optional[float], cache_key: tuple
+    ) -> Optional[str]:
+        """Read one geometry from the local store or S3 and cache it"""
+        logger.info(
+            f"Fetching simplified geometry for division: {division_id} (tolerance: {tolerance})"
+        )
+
+        geometry_json = None
+        if self.has_geometry_store:
+            geometry_json = self._query_local_geometry(division_id, tolerance)
+
+        if geometry_json is None and self.s3_fallback:
+            geometry_json = self._query_remote_geometry(division_id, tolerance)
+
+        if geometry_json:
+            self.cache.set(cache_key, geometry_json, size=len(geometry_json))
+        return geometry_json
+
+    def iter_division_geometries(
+        self, division_ids: Iterable[str], tolerance: Optional[float] = None
+    ) -> Iterator[Tuple[str, str]]:
+        """Yield (id, GeoJSON text) for every resolvable id
+
+        Cached geometries are yielded first. The remaining ids are resolved
+        from the local store in chunks of BATCH_FETCH_SIZE, and whatever is
+        still missing in a single pass over S3 when the fallback is enabled.
+        Unknown ids are skipped.
+        """
+        if not self.db:
+            raise Exception("Database connection not available")
+
+        pending = []
+        for division_id in dict.fromkeys(division_ids):
+            cached = self.cache.get(self._geometry_cache_key(division_id, tolerance))
+            if cached is not MISSING:
+                yield division_id, cached
+            else:
+                pending.append(division_id)
+
+        sources = []
+        if self.has_geometry_store:
+            sources.append(self._query_local_geometries)
+        if self.s3_fallback:
+            sources.append(self._query_remote_geometries_bounded)
+
+        for query_geometries in sources:
+            if not pending:
+                break
+            logger.info(f"Fetching geometry for {len(pending)} divisions")
+            found = set()
+            for division_id, geometry_json in query_geometries(pending, tolerance):
+                self.cache.set(
+                    self._geometry_cache_key(division_id, tolerance),
+                    geometry_json,
+                    size=len(geometry_json),
+                )
+                found.add(division_id)
+                yield division_id, geometry_json
+            pending = [division_id for division_id in pending if division_id not in found]
+
+    def _geometry_cache_key(self, division_id: str, tolerance: Optional[float]) -> tuple:
+        """Cache key for a geometry; requests resolving to the same level share it"""
+        level = self._select_lod(tolerance) if self.geometry_lods else tolerance
+        return ("geometry", division_id, level)
+
+    def get_division_tile(
+        self, z: int, x: int, y: int, filters: Dict[str, bool]
+    ) -> bytes:
+        """Mapbox Vector Tile of the division boundaries intersecting a tile"""
+        if not self.db:
+            raise Exception("Database connection not available")
+        if not (self.spatial_stats and self.has_geometry_store):
+            raise Exception("Vector tiles need the spatial index and geometry store")
+
+        layer_key = "-".join(
+            sorted(name for name in ("city", "state", "county") if filters.get(name, True))
+        ) or "none"
+        cache_key = ("tile", self.release, layer_key, z, x, y)
+        cached = self.cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+
+        if self.tile_store:
+            stored = self.tile_store.get(self.release, layer_key, z, x, y)
+            if stored is not None:
+                self.cache.set(cache_key, stored)
+                return stored
+
+        west, south, east, north = tile_bounds(z, x, y)
+        candidates_query = """
+            SELECT id, name, subtype FROM divisions_spatial
+            WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?
+            AND grid_level <= ?
+        """
+        subtype_filter = subtype_condition(filters)
+        if subtype_filter:
+            candidates_query += f" AND {subtype_filter}"
+        candidates_query += f" ORDER BY grid_level LIMIT {MAX_TILE_FEATURES}"
+
+        with self.pool.connection() as conn:
+            candidates = conn.execute(
+                candidates_query, [east, west, north, south, max_grid_level(z)]
+            ).fetchall()
+
+        properties = {
+            division_id: {"id": division_id, "name": name, "subtype": subtype}
+            for division_id, name, subtype in candidates
+        }
+        features = []
+        if properties:
+            for division_id, geometry_wkb in self._query_local_geometries_wkb(
+                list(properties), zoom_to_tolerance(z)
+            ):
+                features.append((geometry_wkb, properties[division_id]))
+
+        tile = encode_tile(z, x, y, features)
+        logger.info(f"Generated tile {z}/{x}/{y} ({layer_key}) with {len(features)} divisions")
+
+        if self.tile_store:
+            self.tile_store.put(self.release, layer_key, z, x, y, tile)
+        self.cache.set(cache_key, tile)
+        return tile
+
+    def reverse_lookup(
+        self, points: List[Tuple[float, float]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Divisions containing each (lon, lat) point, broadest first
+
+        Candidates for every point come from one bbox join against
+        divisions_spatial. A constant filter on the envelope of all the points
+        lets its Morton clustering skip row groups far from them. A second
+        query tests only those candidates for exact containment against the
+        local geometry store, again for all points at once.
+        """
+        if not self.db:
+            raise Exception("Database connection not available")
+        if not (self.spatial_stats and self.has_geometry_store):
+            raise Exception("Reverse lookup needs the spatial index and geometry store")
+
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(points)
+        pending: Dict[Tuple[float, float], List[int]] = {}
+        for index, point in enumerate(points):
+            cached = self.cache.get(("reverse",) + point)
+            if cached is not MISSING:
+                results[index] = cached
+            else:
+                pending.setdefault(point, []).append(index)
+
+        if pending:
+            lons = [lon for lon, _ in pending]
+            lats = [lat for _, lat in pending]
+            with self.pool.connection() as conn:
+                candidate_rows = metrics.timed_fetch(
+                    conn,
+                    f"""
+                    SELECT
+                        points.lon, points.lat,
+                        {SEARCH_RESULT_COLUMNS}, subtype, (xmax - xmin) * (ymax - ymin) AS area
+                    FROM (SELECT unnest(?) AS lon, unnest(?) AS lat) points
+                    JOIN divisions_spatial
+                        ON xmin <= points.lon AND xmax >= points.lon
+                        AND ymin <= points.lat AND ymax >= points.lat
+                    WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?
+                    """,
+                    [lons, lats, max(lons), min(lons), max(lats), min(lats)],
+                )
+                candidates: Dict[Tuple[float, float], List[Tuple]] = {
+                    point: [] for point in pending
+                }
+                for row in candidate_rows:
+                    candidates[(row[0], row[1])].append(row[2:])
+                # (point, division id) pairs to test, unnested as parallel lists
+                pairs = [
+                    (point, row[0]) for point, rows in candidates.items() for row in rows
+                ]
+                contained = set()
+                if pairs:
+                    division_ids = sorted({division_id for _, division_id in pairs})
+                    placeholders = ", ".join("?" for _ in division_ids)
+                    rows = metrics.timed_fetch(
+                        conn,
+                        f"""
+                        SELECT pairs.lon, pairs.lat, g.id
+                        FROM division_geometry g
+                        JOIN (
+                            SELECT unnest(?) AS lon, unnest(?) AS lat, unnest(?) AS id
+                        ) pairs ON pairs.id = g.id
+                        WHERE g.id IN ({placeholders})
+                        AND ST_Contains(ST_GeomFromWKB(g.geometry), ST_Point(pairs.lon, pairs.lat))
+                        """,
+                        [
+                            [point[0] for point, _ in pairs],
+                            [point[1] for point, _ in pairs],
+                            [division_id for _, division_id in pairs],
+                        ]
+                        + division_ids,
+                    )
+                    contained = {((lon, lat), division_id) for lon, lat, division_id in rows}
+
+            for point, rows in candidates.items():
+                divisions = sorted(
+                    (row for row in rows if (point, row[0]) in contained),
+                    key=lambda row: (subtype_rank(row[-2]), -(row[-1] or 0.0)),
+                )
+                hierarchy = [
+                    dict(zip(SEARCH_RESULT_FIELDS, row), subtype=row[-2])
+                    for row in divisions
+                ]
+                self.cache.set(("reverse",) + point, hierarchy)
+                for index in pending[point]:
+                    results[index] = hierarchy
+
+        return results
+
+    def division_children(
+        self,
+        division_id: str,
+        subtype: Optional[str] = None,
+        limit: int = MAX_CHILDREN,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """A page of the divisions whose parent is division_id, by name
+
+        division_children is sorted by parent id, so the child ids are a range
+        scan; their search columns are joined from divisions_index by id.
+        """
+        if not self.has_hierarchy:
+            raise Exception("Children lookup needs the division hierarchy")
+        cache_key = ("children", division_id, subtype, limit, offset)
+        cached = self.cache.get(cache_key)
+        metrics.label("cache", "miss" if cached is MISSING else "hit")
+        if cached is not MISSING:
+            return cached
+
+        query = f"""
+            SELECT {SEARCH_RESULT_COLUMNS}, subtype
+            FROM division_children c
+            JOIN divisions_index d ON d.id = c.child_id
+            WHERE c.parent_id = ?
+        """
+        params: List[Any] = [division_id]
+        if subtype:
+            query += " AND subtype = ?"
+            params.append(subtype)
+        # id breaks name ties, so pages neither repeat nor skip rows
+        query += " ORDER BY name, id LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        with self.pool.connection() as conn:
+            rows = metrics.timed_fetch(conn, query, params)
+        children = [dict(zip(SEARCH_RESULT_FIELDS, row), subtype=row[-1]) for row in rows]
+        self.cache.set(cache_key, children)
+        return children
+
+    def division_ancestors(self, division_id: str) -> List[Dict[str, Any]]:
+        """Divisions that contain division_id in the hierarchy, broadest first
+
+        A range scan of division_ancestors, which is sorted by descendant id,
+        joined to divisions_index by id.
+        """
+        if not self.has_hierarchy:
+            raise Exception("Ancestors lookup needs the division hierarchy")
+        cache_key = ("ancestors", division_id)
+        cached = self.cache.get(cache_key)
+        metrics.label("cache", "miss" if cached is MISSING else "hit")
+        if cached is not MISSING:
+            return cached
+
+        with self.pool.connection() as conn:
+            rows = metrics.timed_fetch(
+                conn,
+                f"""
+                SELECT {SEARCH_RESULT_COLUMNS}, subtype
+                FROM division_ancestors a
+                JOIN divisions_index d ON d.id = a.ancestor_id
+                WHERE a.descendant_id = ?
+                ORDER BY a.depth DESC
+                """,
+                [division_id],
+            )
+        ancestors = [dict(zip(SEARCH_RESULT_FIELDS, row), subtype=row[-1]) for row in rows]
+        self.cache.set(cache_key, ancestors)
+        return ancestors
+
+    def _export_selection(self, spec: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """SQL selecting id, name, subtype and country of the divisions matching spec
+
+        spec may hold ids, country, subtypes, query (with mode) and bbox;
+        every filter given applies.
+        """
+        if spec.get("query"):
+            source, params = name_source(
+                spec["query"], spec.get("mode") or "scan", self.has_terms_index
+            )
+        else:
+            source, params = "divisions_index", []
+        conditions = ["TRUE"]
+        if spec.get("ids"):
+            conditions.append(f"id IN ({', '.join('?' for _ in spec['ids'])})")
+            params.extend(spec["ids"])
+        if spec.get("country"):
+            conditions.append("country = ?")
+            params.append(spec["country"])
+        if spec.get("subtypes"):
+            conditions.append(f"subtype IN ({', '.join('?' for _ in spec['subtypes'])})")
+            params.extend(spec["subtypes"])
+        bbox = spec.get("bbox")
+        if bbox:
+            conditions.append(
+                "bbox['xmin'] <= ? AND bbox['xmax'] >= ? AND bbox['ymin'] <= ? AND bbox['ymax'] >= ?"
+            )
+            params.extend([bbox["east"], bbox["west"], bbox["north"], bbox["south"]])
+        return (
+            f"""
+            SELECT id, name, subtype, country FROM {source}
+            WHERE {' AND '.join(conditions)}
+            """,
+            params,
+        )
+
+    def export_count(self, spec: Dict[str, Any]) -> int:
+        """Divisions matching spec, counted only up to MAX_EXPORT_FEATURES + 1"""
+        selected, params = self._export_selection(spec)
+        with self.pool.connection() as conn:
+            return metrics.timed_fetch(
+                conn,
+                f"SELECT COUNT(*) FROM ({selected} LIMIT {MAX_EXPORT_FEATURES + 1})",
+                params,
+                many=False,
+            )[0]
+
+    def export_query(
+        self, spec: Dict[str, Any], export_format: str
+    ) -> Tuple[str, List[Any]]:
+        """SQL selecting EXPORT_PROPERTIES plus geometry for the divisions matching spec
+
+        See _export_selection for the filters; spec may also hold a tolerance.
+        Geometry is GeoJSON text for "geojson", the stored WKB for "geoparquet"
+        and a GEOMETRY value for "flatgeobuf". The query has no ORDER BY, so
+        rows stream from the scan instead of being sorted first.
+        """
+        if not self.has_geometry_store:
+            raise Exception("Export needs the local geometry store")
+
+        selected, params = self._export_selection(spec)
+
+        if export_format == "geojson":
+            geometry = "ST_AsGeoJSON(ST_GeomFromWKB(g.geometry))"
+        elif export_format == "geoparquet":
+            geometry = "g.geometry"
+        else:
+            geometry = "ST_GeomFromWKB(g.geometry)"
+
+        tolerance = spec.get("tolerance")
+        if tolerance is None or not self.geometry_lods:
+            return (
+                f"""
+                WITH selected AS ({selected})
+                SELECT s.id, s.name, s.subtype, s.country, {geometry} AS geometry
+                FROM selected s
+                JOIN division_geometry g ON g.id = s.id
+                """,
+                params,
+            )
+        # Finest stored level at or below the selected one, as in
+        # _query_local_geometry; only ids and levels are grouped, so no
+        # geometry is held in the aggregate
+        return (
+            f"""
+            WITH selected AS ({selected}),
+            chosen AS (
+                SELECT id, max(lod) AS lod FROM division_geometry_lod
+                WHERE lod <= ? AND id IN (SELECT id FROM selected)
+                GROUP BY id
+            )
+            SELECT s.id, s.name, s.subtype, s.country, {geometry} AS geometry
+            FROM selected s
+            JOIN chosen c ON c.id = s.id
+            JOIN division_geometry_lod g ON g.id = c.id AND g.lod = c.lod
+            """,
+            params + [self._select_lod(tolerance)],
+        )
+
+    @staticmethod
+    def _iter_result_rows(result) -> Iterator[Tuple]:
+        """Yield the rows of a DuckDB result in chunks"""
+        while True:
+            rows = result.fetchmany(BATCH_FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def write_export_file(self, sql: str, params: List[Any], export_format: str) -> str:
+        """Write the export rows into a temporary file on an export cursor; return its path
+
+        GeoJSON is written from rows fetched in chunks and the file formats by
+        DuckDB COPY, so memory stays bounded by a chunk or a row group rather
+        than by the size of the export. The cursor is returned before the file
+        is sent, so a slow download holds none.
+        """
+        path = export_path(export_format)
+        quoted_path = path.replace("'", "''")
+        try:
+            with self.export_pool.connection() as conn:
+                with metrics.span("duckdb"):
+                    if export_format == "geojson":
+                        write_geojson(path, self._iter_result_rows(conn.execute(sql, params)))
+                    else:
+                        conn.execute(
+                            f"COPY ({sql}) TO '{quoted_path}' ({copy_options(export_format)})",
+                            params,
+                        )
+        except Exception:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            raise
+        return path
+
+    def _query_local_geometries_wkb(
+        self, division_ids: List[str], tolerance: Optional[float] = None
+    ) -> List[Tuple[str, bytes]]:
+        """Read simplified WKB for many ids from the local store in one pass"""
+        placeholders = ", ".join("?" for _ in division_ids)
+        with self.pool.connection() as conn:
+            if self.geometry_lods:
+                return conn.execute(
+                    f"""
+                    SELECT id, arg_max(geometry, lod) as geometry
+                    FROM division_geometry_lod
+                    WHERE id IN ({placeholders}) AND lod <= ?
+                    GROUP BY id
+                    """,
+                    division_ids + [self._select_lod(tolerance)],
+                ).fetchall()
+            return conn.execute(
+                f"""
+                SELECT 
+                    id,
+                    CAST(ST_AsWKB(ST_Simplify(ST_GeomFromWKB(geometry), ?)) AS BLOB) as geometry
+                FROM division_geometry
+                WHERE id IN ({placeholders})
+                """,
+                [tolerance or DEFAULT_SIMPLIFY_TOLERANCE] + division_ids,
+            ).fetchall()
+
+    def _select_lod(self, tolerance: Optional[float]) -> int:
+        """Pick the coarsest precomputed level that is still within the tolerance"""
+        selected = self.geometry_lods[0][0]
+        if tolerance is None:
+            return selected
+        for lod, lod_tolerance in self.geometry_lods:
+            if lod_tolerance <= tolerance:
+                selected = lod
+        return selected
+
+    def _query_local_geometry(
+        self, division_id: str, tolerance: Optional[float] = None
+    ) -> Optional[str]:
+        """Read geometry from the tables built by build_index.py, on a geometry worker cursor"""
+        with self.geometry_pool.connection() as conn:
+            if self.geometry_lods:
+                # Coarse levels are skipped at build time when they would not drop
+                # any vertices, so fall back to the nearest finer stored level
+                result = metrics.timed_fetch(
+                    conn,
+                    """
+                    SELECT 
+                        ST_AsGeoJSON(ST_GeomFromWKB(geometry)) as geometry_json
+                    FROM division_geometry_lod
+                    WHERE id = ? AND lod <= ?
+                    ORDER BY lod DESC
+                    LIMIT 1
+                    """,
+                    [division_id, self._select_lod(tolerance)],
+                    many=False,
+                )
+            else:
+                result = metrics.timed_fetch(
+                    conn,
+                    """
+                    SELECT 
+                        ST_AsGeoJSON(ST_Simplify(ST_GeomFromWKB(geometry), ?)) as geometry_json
+                    FROM division_geometry
+                    WHERE id = ?
+                    LIMIT 1
+                    """,
+                    [tolerance or DEFAULT_SIMPLIFY_TOLERANCE, division_id],
+                    many=False,
+                )
+        return result[0] if result else None
+
+    def _query_local_geometries(
+        self, division_ids: List[str], tolerance: Optional[float] = None
+    ) -> Iterator[Tuple[str, str]]:
+        """Read geometry for many ids from the local store, BATCH_FETCH_SIZE ids per query
+
+        Each chunk is fetched in full and its cursor returned to the pool
+        before the rows are yielded, so a slowly read stream never holds one.
+        """
+        for start in range(0, len(division_ids), BATCH_FETCH_SIZE):
+            chunk = division_ids[start : start + BATCH_FETCH_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            with self.pool.connection() as conn:
+                if self.geometry_lods:
+                    # Finest stored level at or below the selected one, as in
+                    # _query_local_geometry
+                    rows = conn.execute(
+                        f"""
+                        SELECT 
+                            id,
+                            ST_AsGeoJSON(ST_GeomFromWKB(arg_max(geometry, lod))) as geometry_json
+                        FROM division_geometry_lod
+                        WHERE id IN ({placeholders}) AND lod <= ?
+                        GROUP BY id
+                        """,
+                        chunk + [self._select_lod(tolerance)],
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        f"""
+                        SELECT 
+                            id,
+                            ST_AsGeoJSON(ST_Simplify(ST_GeomFromWKB(geometry), ?)) as geometry_json
+                        FROM division_geometry
+                        WHERE id IN ({placeholders})
+                        """,
+                        [tolerance or DEFAULT_SIMPLIFY_TOLERANCE] + chunk,
+                    ).fetchall()
+            for division_id, geometry_json in rows:
+                if geometry_json:
+                    yield division_id, geometry_json
+
+    def _query_remote_geometries(
+        self, division_ids: List[str], tolerance: Optional[float] = None
+    ) -> Iterator[Tuple[str, str]]:
+        """Scan the remote Overture parquet files once for many ids, on a geometry worker cursor"""
+        self._setup_httpfs()
+        placeholders = ", ".join("?" for _ in division_ids)
+        with self.geometry_pool.connection() as conn:
+            result = conn.execute(
+                f"""
+                SELECT 
+                    id,
+                    ST_AsGeoJSON(ST_Simplify(ST_GeomFromWKB(geometry), ?)) as geometry_json
+                FROM read_parquet('{self.source}')
+                WHERE id IN ({placeholders})
+                """,
+                [tolerance or DEFAULT_SIMPLIFY_TOLERANCE] + division_ids,
+            )
+            yield from self._fetch_geometry_rows(result)
+
+    def _query_remote_geometries_bounded(
+        self, division_ids: List[str], tolerance: Optional[float] = None
+    ) -> Iterator[Tuple[str, str]]:
+        """Run the remote scan on the geometry pool, so a slow read times out"""
+        with self.geometry_flights.waiter():
+            future = self.geometry_flights.submit(
+                ("remote", tuple(division_ids), tolerance),
+                lambda: list(self._query_remote_geometries(division_ids, tolerance)),
+            )
+            try:
+                rows = future.result(timeout=self.geometry_timeout)
+            except FutureTimeout:
+                self.geometry_flights.record_timeout()
+                raise
+        yield from rows
+
+    def _fetch_geometry_rows(self, result) -> Iterator[Tuple[str, str]]:
+        """Yield (id, geometry_json) rows in chunks so large batches stream"""
+        while True:
+            rows = result.fetchmany(BATCH_FETCH_SIZE)
+            if not rows:
+                return
+            for division_id, geometry_json in rows:
+                if geometry_json:
+                    yield division_id, geometry_json
+
+    def _query_remote_geometry(
+        self, division_id: str, tolerance: Optional[float] = None
+    ) -> Optional[str]:
+        """Scan the remote Overture parquet files for a division's geometry"""
+        logger.info(f"Falling back to remote geometry scan for division: {division_id}")
+        self._setup_httpfs()
+        with self.geometry_pool.connection() as conn:
+            result = metrics.timed_fetch(
+                conn,
+                f"""
+                SELECT 
+                    ST_AsGeoJSON(ST_Simplify(ST_GeomFromWKB(geometry), ?)) as geometry_json
+                FROM read_parquet('{self.source}')
+                WHERE id = ?
+                LIMIT 1
+                """,
+                [tolerance or DEFAULT_SIMPLIFY_TOLERANCE, division_id],
+                many=False,
+            )
+        return result[0] if result else None
 
     def _query_nominatim_data(
         self,
@@ -272,9 +1323,6 @@ class OvertureDataService:
         try:
             logger.info(f"Using Nominatim fallback for query: {query}")
 
-            # Nominatim API endpoint
-            base_url = "https://nominatim.openstreetmap.org/search"
-
             # Prepare search parameters
             params = {
                 "q": query,
@@ -308,17 +1356,8 @@ class OvertureDataService:
             ):
                 params["featuretype"] = "state"
 
-            # Make the API request
-            headers = {
-                "User-Agent": "DivisionShapeViewer/1.0 (https://github.com/your-repo)"
-            }
-
-            response = requests.get(
-                base_url, params=params, headers=headers, timeout=10
-            )
-            response.raise_for_status()
-
-            data = response.json()
+            # Cached, rate limited and skipped entirely while the breaker is open
+            data = self.nominatim.search(params)
 
             # Convert Nominatim results to our format
             formatted_results = []
@@ -403,7 +1442,35 @@ class OvertureDataService:
 
 
 # Initialize service
-overture_service = OvertureDataService()
+overture_service = OvertureDataService(
+    load_config(), connect=not env_flag("DUCKDB_DEFER_CONNECT")
+)
+
+
+@app.before_request
+def start_timing():
+    """Begin collecting timing spans for this request"""
+    metrics.start_request(request.endpoint or "unmatched")
+
+
+@app.teardown_request
+def finish_timing(error=None):
+    """Record the request's latency and spans into the metrics histograms"""
+    metrics.finish_request()
+
+
+@app.after_request
+def record_status(response):
+    """Label the request latency with the status class; runs after compress"""
+    metrics.label("status", f"{response.status_code // 100}xx")
+    return response
+
+
+@app.after_request
+def compress(response):
+    """gzip/brotli encode large JSON and tile responses"""
+    with metrics.span("compress"):
+        return compress_response(response, request.accept_encodings)
 
 
 @app.route("/")
@@ -422,39 +1489,427 @@ def serve_static(filename):
 def search_divisions():
     """Search for divisions based on query and filters"""
     try:
-        data = request.get_json()
-        query = data.get("query", "")
-        filters = data.get("filters", {})
-        bbox = data.get("bbox", None)
+        with metrics.span("parse"):
+            data = request.get_json()
+            query = data.get("query", "")
+            filters = data.get("filters", {})
+            bbox = data.get("bbox", None)
+            mode = data.get("mode", "scan")
+            ranking = data.get("ranking", "name")
 
         if not query:
             return jsonify({"error": "Query parameter is required"}), 400
+        if mode not in SEARCH_MODES:
+            return (
+                jsonify({"error": f"mode must be one of {', '.join(SEARCH_MODES)}"}),
+                400,
+            )
+        if ranking not in SEARCH_RANKINGS:
+            return (
+                jsonify(
+                    {"error": f"ranking must be one of {', '.join(SEARCH_RANKINGS)}"}
+                ),
+                400,
+            )
 
-        results = overture_service.search_divisions(query, filters, bbox)
+        results = overture_service.search_divisions(
+            query, filters, bbox, mode, ranking
+        )
+        try:
+            overture_service.prefetch_geometries(results, data.get("viewport"))
+        except Exception as e:
+            logger.warning(f"Geometry prefetch not scheduled: {e}")
+        metrics.label("results", metrics.count_bucket(len(results)))
+        metrics.SEARCH_RESULTS.observe(
+            len(results), bbox="true" if bbox else "false"
+        )
 
-        return jsonify(results)
+        with metrics.span("serialize"):
+            return jsonify(results)
 
     except Exception as e:
         logger.error(f"Search endpoint error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/api/autocomplete", methods=["GET"])
+def autocomplete():
+    """Typeahead suggestions for ?q=<prefix>, up to ?limit= (default 10, max 20)"""
+    prefix = request.args.get("q", "").strip()
+    limit = request.args.get("limit", AUTOCOMPLETE_LIMIT, type=int)
+    if not prefix:
+        return jsonify({"error": "q parameter is required"}), 400
+    if not 1 <= limit <= MAX_AUTOCOMPLETE_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_AUTOCOMPLETE_LIMIT}"}), 400
+
+    try:
+        response = jsonify(overture_service.autocomplete(prefix, limit))
+        # Suggestions only change with a new index build
+        response.headers["Cache-Control"] = "public, max-age=300"
+        return response
+    except Exception as e:
+        logger.error(f"Autocomplete endpoint error: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+def parse_tolerance(values: Dict[str, Any]) -> Optional[float]:
+    """Simplification tolerance from "tolerance" or else "zoom", or None for full resolution
+
+    Raises ValueError or TypeError when the given value is not a finite,
+    non-negative number.
+    """
+    tolerance = values.get("tolerance")
+    zoom = values.get("zoom")
+    if tolerance is not None:
+        tolerance = float(tolerance)
+    elif zoom is not None:
+        zoom = float(zoom)
+        if not (math.isfinite(zoom) and zoom >= 0):
+            raise ValueError("zoom must be a finite, non-negative number")
+        tolerance = zoom_to_tolerance(zoom)
+    if tolerance is not None and not (math.isfinite(tolerance) and tolerance >= 0):
+        raise ValueError("tolerance must be a finite, non-negative number")
+    return tolerance
+
+
 @app.route("/api/geometry/<division_id>", methods=["GET"])
 def get_geometry(division_id):
-    """Get geometry for a specific division ID"""
+    """Get geometry for a specific division ID, simplified for ?zoom= or ?tolerance="""
+    with metrics.span("parse"):
+        try:
+            tolerance = parse_tolerance(request.args)
+        except (TypeError, ValueError):
+            return jsonify({"error": "zoom and tolerance must be finite, non-negative numbers"}), 400
+
     try:
-        geometry = overture_service.get_division_geometry(division_id)
-        return jsonify({"geometry": geometry})
+        geometry_json = overture_service.get_division_geometry_json(division_id, tolerance)
+        metrics.label("size", metrics.size_bucket(len(geometry_json)))
+        metrics.GEOMETRY_BYTES.observe(len(geometry_json))
+
+        # The GeoJSON text from DuckDB is spliced in as is instead of being
+        # decoded and re-encoded
+        with metrics.span("serialize"):
+            return Response(
+                '{"geometry":' + geometry_json + "}", mimetype="application/json"
+            )
 
+    except FutureTimeout:
+        return jsonify({"error": "Geometry fetch timed out"}), 504
+    except Overloaded:
+        return jsonify({"error": "Too many geometry requests"}), 503, {"Retry-After": "1"}
     except Exception as e:
         logger.error(f"Geometry endpoint error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/api/geometry/batch", methods=["POST"])
+def get_geometry_batch():
+    """Get geometries for many division IDs as a GeoJSON FeatureCollection
+
+    Body: {"ids": [...], "zoom": z or "tolerance": t, "stream": true|false}
+    """
+    data = request.get_json(silent=True) or {}
+    division_ids = data.get("ids")
+    if (
+        not isinstance(division_ids, list)
+        or not division_ids
+        or not all(isinstance(division_id, str) for division_id in division_ids)
+    ):
+        return jsonify({"error": "ids must be a non-empty list of strings"}), 400
+    if len(division_ids) > MAX_BATCH_IDS:
+        return jsonify({"error": f"At most {MAX_BATCH_IDS} ids per request"}), 400
+
+    try:
+        tolerance = parse_tolerance(data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "zoom and tolerance must be finite, non-negative numbers"}), 400
+
+    def features() -> Iterator[str]:
+        """GeoJSON Feature text per division, with the geometry text spliced in"""
+        for division_id, geometry_json in overture_service.iter_division_geometries(
+            division_ids, tolerance
+        ):
+            quoted_id = json.dumps(division_id)
+            yield (
+                f'{{"type":"Feature","id":{quoted_id},"properties":{{"id":{quoted_id}}},'
+                f'"geometry":{geometry_json}}}'
+            )
+
+    if data.get("stream"):
+
+        def generate() -> Iterator[str]:
+            yield '{"type":"FeatureCollection","features":['
+            try:
+                for index, feature in enumerate(features()):
+                    yield ("," if index else "") + feature
+            except Exception as e:
+                # Headers are already sent; ending without the closing brackets
+                # leaves invalid JSON, so a client cannot mistake it for a full
+                # collection, as in /api/export
+                logger.error(f"Batch geometry stream failed: {e}")
+                return
+            yield "]}"
+
+        return Response(
+            stream_with_context(generate()), mimetype="application/geo+json"
+        )
+
+    try:
+        return Response(
+            '{"type":"FeatureCollection","features":[' + ",".join(features()) + "]}",
+            mimetype="application/geo+json",
+        )
+    except FutureTimeout:
+        return jsonify({"error": "Geometry fetch timed out"}), 504
+    except Overloaded:
+        return jsonify({"error": "Too many geometry requests"}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        logger.error(f"Batch geometry endpoint error: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+def parse_point(value: Any) -> Optional[Tuple[float, float]]:
+    """(lon, lat) from a {"lon": x, "lat": y} object, or None if it is not valid"""
+    try:
+        lon, lat = float(value["lon"]), float(value["lat"])
+    except (TypeError, KeyError, ValueError):
+        return None
+    if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        return None
+    return lon, lat
+
+
+@app.route("/api/reverse", methods=["GET", "POST"])
+def reverse_lookup():
+    """Divisions containing a point, broadest first
+
+    GET ?lon=&lat= for one point, or POST {"points": [{"lon": x, "lat": y}, ...]}
+    for up to 500 points at once.
+    """
+    if not (overture_service.spatial_stats and overture_service.has_geometry_store):
+        return (
+            jsonify({"error": "Reverse lookup needs an index built with --with-geometry"}),
+            501,
+        )
+
+    with metrics.span("parse"):
+        batch = request.method == "POST"
+        if batch:
+            values = (request.get_json(silent=True) or {}).get("points")
+            if not isinstance(values, list) or not values:
+                return jsonify({"error": "points must be a non-empty list"}), 400
+            if len(values) > MAX_REVERSE_POINTS:
+                return jsonify({"error": f"At most {MAX_REVERSE_POINTS} points per request"}), 400
+        else:
+            values = [request.args]
+        points = [parse_point(value) for value in values]
+        if None in points:
+            return jsonify({"error": "Each point needs lon in [-180, 180] and lat in [-90, 90]"}), 400
+    metrics.label("points", metrics.count_bucket(len(points)))
+
+    try:
+        hierarchies = overture_service.reverse_lookup(points)
+    except Exception as e:
+        logger.error(f"Reverse lookup endpoint error: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    with metrics.span("serialize"):
+        results = [
+            {"lon": lon, "lat": lat, "divisions": divisions}
+            for (lon, lat), divisions in zip(points, hierarchies)
+        ]
+        return jsonify({"results": results} if batch else results[0])
+
+
+@app.route("/api/divisions/<division_id>/children", methods=["GET"])
+def get_children(division_id):
+    """Divisions directly below a division, optionally ?subtype= only
+
+    Paged by name with ?limit= (max 1000) and ?offset=.
+    """
+    if not overture_service.has_hierarchy:
+        return jsonify({"error": "Hierarchy lookups need an index built with the division hierarchy"}), 501
+
+    subtype = request.args.get("subtype") or None
+    limit = request.args.get("limit", MAX_CHILDREN, type=int)
+    if not 1 <= limit <= MAX_CHILDREN:
+        return jsonify({"error": f"limit must be between 1 and {MAX_CHILDREN}"}), 400
+    offset = request.args.get("offset", 0, type=int)
+    if offset < 0:
+        return jsonify({"error": "offset must not be negative"}), 400
+
+    try:
+        children = overture_service.division_children(division_id, subtype, limit, offset)
+    except Exception as e:
+        logger.error(f"Children endpoint error for {division_id}: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    metrics.label("results", metrics.count_bucket(len(children)))
+    with metrics.span("serialize"):
+        return jsonify({"id": division_id, "children": children})
+
+
+@app.route("/api/divisions/<division_id>/ancestors", methods=["GET"])
+def get_ancestors(division_id):
+    """Divisions containing a division in the hierarchy, broadest first"""
+    if not overture_service.has_hierarchy:
+        return jsonify({"error": "Hierarchy lookups need an index built with the division hierarchy"}), 501
+
+    try:
+        ancestors = overture_service.division_ancestors(division_id)
+    except Exception as e:
+        logger.error(f"Ancestors endpoint error for {division_id}: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    with metrics.span("serialize"):
+        return jsonify({"id": division_id, "ancestors": ancestors})
+
+
+def export_spec(values: Dict[str, Any], from_query_string: bool) -> Dict[str, Any]:
+    """Export filters from a JSON body, or from comma-separated query arguments"""
+    spec = {
+        key: values.get(key) for key in ("ids", "country", "subtypes", "query", "bbox")
+    }
+    spec["mode"] = values.get("mode") or "scan"
+    if from_query_string:
+        spec["ids"] = values.get("ids", "").split(",") if values.get("ids") else None
+        spec["subtypes"] = (
+            values.get("subtypes", "").split(",") if values.get("subtypes") else None
+        )
+        if values.get("bbox"):
+            west, south, east, north = (float(value) for value in values["bbox"].split(","))
+            spec["bbox"] = {"west": west, "south": south, "east": east, "north": north}
+    for key in ("ids", "subtypes"):
+        if spec[key] is not None and not (
+            isinstance(spec[key], list) and all(isinstance(value, str) for value in spec[key])
+        ):
+            raise ValueError(f"{key} must be a list of strings")
+    if spec["bbox"] is not None:
+        spec["bbox"] = {
+            side: float(spec["bbox"][side]) for side in ("west", "south", "east", "north")
+        }
+    spec["tolerance"] = parse_tolerance(values)
+    return spec
+
+
+@app.route("/api/export", methods=["GET", "POST"])
+def export_divisions():
+    """Stream the divisions matching the filters as GeoJSON, GeoParquet or FlatGeobuf
+
+    Filters: ids, country, subtypes, query (with mode) and bbox, plus zoom or
+    tolerance for simplified shapes. GET takes them as query arguments, with
+    lists comma-separated and bbox as west,south,east,north.
+    """
+    if not overture_service.has_geometry_store:
+        return jsonify({"error": "Export needs an index built with --with-geometry"}), 501
+
+    with metrics.span("parse"):
+        from_query_string = request.method == "GET"
+        values = request.args if from_query_string else (request.get_json(silent=True) or {})
+        export_format = values.get("format", "geojson")
+        if export_format not in EXPORT_FORMATS:
+            return (
+                jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}),
+                400,
+            )
+        try:
+            spec = export_spec(values, from_query_string)
+        except (TypeError, KeyError, ValueError) as e:
+            return jsonify({"error": f"Invalid export filters: {e}"}), 400
+        if not any(spec.get(key) for key in ("ids", "country", "subtypes", "query", "bbox")):
+            return jsonify({"error": "Export needs ids, country, subtypes, query or bbox"}), 400
+        if spec["mode"] not in SEARCH_MODES:
+            return jsonify({"error": f"mode must be one of {', '.join(SEARCH_MODES)}"}), 400
+    metrics.label("format", export_format)
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    headers = {"Content-Disposition": f'attachment; filename="divisions.{extension}"'}
+    try:
+        if overture_service.export_count(spec) > MAX_EXPORT_FEATURES:
+            return (
+                jsonify(
+                    {
+                        "error": f"More than {MAX_EXPORT_FEATURES} divisions match; "
+                        "narrow the filters"
+                    }
+                ),
+                413,
+            )
+        sql, params = overture_service.export_query(spec, export_format)
+        path = overture_service.write_export_file(sql, params, export_format)
+    except PoolTimeout:
+        return jsonify({"error": "Too many exports in progress"}), 503, {"Retry-After": "5"}
+    except Exception as e:
+        logger.error(f"Export endpoint error: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+    return Response(stream_file(path), mimetype=mimetype, headers=headers)
+
+
+@app.route("/tiles/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+def get_tile(z, x, y):
+    """Mapbox Vector Tile of division boundaries, filtered by ?types=city,state,county"""
+    if not tiles_available():
+        return jsonify({"error": "Vector tiles need mapbox-vector-tile and shapely"}), 501
+    if not (0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z):
+        return jsonify({"error": "Tile coordinates out of range"}), 404
+
+    filters = filters_from_types(request.args.get("types"))
+    try:
+        tile = overture_service.get_division_tile(z, x, y, filters)
+    except Exception as e:
+        logger.error(f"Tile endpoint error for {z}/{x}/{y}: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    response = Response(tile, mimetype="application/vnd.mapbox-vector-tile")
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    response.add_etag()
+    return response.make_conditional(request)
+
+
 @app.route("/api/health")
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "overture-maps-viewer"})
+    return jsonify(
+        {
+            "status": "healthy",
+            "service": "overture-maps-viewer",
+            "release": overture_service.release,
+            "cache": overture_service.cache.stats(),
+            "pool": overture_service.pool.stats() if overture_service.pool else None,
+            "geometry_pool": overture_service.geometry_pool.stats()
+            if overture_service.geometry_pool
+            else None,
+            "export_pool": overture_service.export_pool.stats()
+            if overture_service.export_pool
+            else None,
+            "geometry": overture_service.geometry_flights.stats(),
+            "prefetch": overture_service.prefetcher.stats(),
+            "nominatim": overture_service.nominatim.stats(),
+        }
+    )
+
+
+@app.route("/api/metrics")
+def metrics_endpoint():
+    """Latency histograms and service counters in the Prometheus text format"""
+    nominatim_stats = overture_service.nominatim.stats()
+    nominatim_stats["circuit_open"] = nominatim_stats.pop("circuit") != "closed"
+    body = metrics.render(
+        {
+            "cache": overture_service.cache.stats(),
+            "pool": overture_service.pool.stats() if overture_service.pool else {},
+            "geometry_pool": overture_service.geometry_pool.stats()
+            if overture_service.geometry_pool
+            else {},
+            "export_pool": overture_service.export_pool.stats()
+            if overture_service.export_pool
+            else {},
+            "geometry": overture_service.geometry_flights.stats(),
+            "prefetch": overture_service.prefetcher.stats(),
+            "nominatim": nominatim_stats,
+        }
+    )
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark autocomplete lookups: in-memory name index against the SQL prefix range
+
+Each simulated user types sampled names one keystroke at a time, from the
+second character on, while the other users do the same concurrently.
+
+Usage:
+    python benchmarks/bench_autocomplete.py --db-path ./divisions_index.duckdb --users 1,8,32
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from autocomplete import NameIndex  # noqa: E402
+from search_index import prefix_upper_bound  # noqa: E402
+
+
+def sample_keystrokes(db, count: int, seed: int) -> list:
+    """Every prefix of at least two characters of some sampled names"""
+    names = [
+        row[0]
+        for row in db.execute(
+            "SELECT name FROM divisions_index USING SAMPLE 2000 ROWS"
+        ).fetchall()
+    ]
+    rng = random.Random(seed)
+    prefixes = []
+    for name in rng.sample(names, min(count, len(names))):
+        prefixes.extend(name[:end] for end in range(2, min(len(name), 12) + 1))
+    return prefixes
+
+
+def sql_lookup(conn, prefix: str, limit: int) -> list:
+    """The query the endpoint falls back to while the name index loads"""
+    prefix_upper = prefix.upper()
+    return conn.execute(
+        """
+        SELECT id, name, subtype FROM divisions_index
+        WHERE name_upper >= ? AND name_upper < ?
+        ORDER BY name_upper = ? DESC, importance DESC
+        LIMIT ?
+        """,
+        [prefix_upper, prefix_upper_bound(prefix_upper), prefix_upper, limit],
+    ).fetchall()
+
+
+def run_users(db, lookup, keystrokes: list, users: int) -> tuple:
+    """Run every user's keystrokes concurrently; return (latencies in ms, seconds)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def user():
+        conn = db.cursor()
+        local = []
+        for prefix in keystrokes:
+            start = time.perf_counter()
+            lookup(conn, prefix)
+            local.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--db-path", default=os.environ.get("DUCKDB_PATH", "./divisions_index.duckdb")
+    )
+    parser.add_argument("--users", default="1,8,32")
+    parser.add_argument("--names", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db = duckdb.connect(args.db_path, read_only=True)
+    keystrokes = sample_keystrokes(db, args.names, args.seed)
+
+    load_start = time.perf_counter()
+    name_index = NameIndex.load(db)
+    print(
+        f"Loaded {len(name_index)} names in {time.perf_counter() - load_start:.1f}s, "
+        f"{len(keystrokes)} keystrokes per user"
+    )
+
+    lookups = {
+        "memory": lambda conn, prefix: name_index.suggest(prefix, args.limit),
+        "sql": lambda conn, prefix: sql_lookup(conn, prefix, args.limit),
+    }
+
+    print(f"{'users':>5} {'lookup':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for users in [int(value) for value in args.users.split(",")]:
+        for name, lookup in lookups.items():
+            latencies, seconds = run_users(db, lookup, keystrokes, users)
+            print(
+                f"{users:>5} {name:>7} {statistics.median(latencies):>9.3f} "
+                f"{percentile(latencies, 95):>9.3f} {percentile(latencies, 99):>9.3f} "
+                f"{len(latencies) / seconds:>9.0f}"
+            )
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark indexed name search modes against the leading-wildcard LIKE scan
+
+Usage:
+    python benchmarks/bench_name_search.py --db-path ./divisions_index.duckdb
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from search_index import name_source  # noqa: E402
+
+
+def sample_queries(db, length: int, count: int, seed: int) -> list:
+    """Pick query strings from real names: half name prefixes, half word prefixes"""
+    names = [
+        row[0]
+        for row in db.execute(
+            "SELECT name_upper FROM divisions_index WHERE length(name_upper) >= ? USING SAMPLE 2000 ROWS",
+            [length],
+        ).fetchall()
+    ]
+    rng = random.Random(seed)
+    queries = []
+    for i in range(min(count, len(names))):
+        name = rng.choice(names)
+        word_starts = [0] + [
+            pos + 1
+            for pos, char in enumerate(name[:-length])
+            if char in " -(/" and pos + 1 + length <= len(name)
+        ]
+        start = 0 if i % 2 == 0 else rng.choice(word_starts)
+        queries.append(name[start : start + length])
+    return queries
+
+
+def time_mode(db, queries: list, mode: str, repeat: int) -> tuple:
+    """Run each query through a mode and return (latencies in ms, result sets)"""
+    latencies = []
+    results = []
+    for query in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            source, params = name_source(query, mode)
+            rows = db.execute(
+                f"SELECT id FROM {source} ORDER BY name, id LIMIT 20", params
+            ).fetchall()
+            latencies.append((time.perf_counter() - start) * 1000)
+        results.append(sorted(row[0] for row in rows))
+    return latencies, results
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--db-path", default=os.environ.get("DUCKDB_PATH", "./divisions_index.duckdb")
+    )
+    parser.add_argument("--lengths", default="1,2,3,4,5,6,8,10")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db = duckdb.connect(args.db_path, read_only=True)
+
+    print(f"{'len':>4} {'mode':>6} {'p50 ms':>9} {'p95 ms':>9} {'speedup':>8} {'same':>5}")
+    for length in [int(value) for value in args.lengths.split(",")]:
+        queries = sample_queries(db, length, args.queries, args.seed)
+        if not queries:
+            continue
+
+        baseline, baseline_results = time_mode(db, queries, "scan", args.repeat)
+        baseline_p50 = statistics.median(baseline)
+        print(
+            f"{length:>4} {'scan':>6} {baseline_p50:>9.2f} {percentile(baseline, 95):>9.2f} {'1.00x':>8} {'-':>5}"
+        )
+
+        for mode in ("prefix", "word"):
+            latencies, results = time_mode(db, queries, mode, args.repeat)
+            p50 = statistics.median(latencies)
+            # Indexed modes match a subset of the substring matches, so "same"
+            # counts queries whose top 20 is unchanged
+            same = sum(a == b for a, b in zip(results, baseline_results))
+            print(
+                f"{length:>4} {mode:>6} {p50:>9.2f} {percentile(latencies, 95):>9.2f} "
+                f"{baseline_p50 / p50 if p50 else 0:>7.2f}x {same:>5}"
+            )
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
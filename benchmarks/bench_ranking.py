@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark relevance ranking against alphabetical ordering on a fixed query set
+
+Relevance is measured as the rank of the first result whose name equals the
+query exactly and whose subtype is one of the expected ones; latency as the
+time to fetch the top 20.
+
+Usage:
+    python benchmarks/bench_ranking.py --db-path ./divisions_index.duckdb
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from search_index import name_source, relevance_score  # noqa: E402
+
+# (query, subtypes an exact-name result must have to count as the right answer)
+QUERIES = [
+    ("Paris", ("locality", "localadmin")),
+    ("London", ("locality", "localadmin")),
+    ("Berlin", ("region", "locality")),
+    ("Springfield", ("locality",)),
+    ("Georgia", ("country", "region")),
+    ("Texas", ("region",)),
+    ("France", ("country",)),
+    ("Victoria", ("region", "locality")),
+    ("Santa Cruz", ("locality", "county", "region")),
+    ("Cambridge", ("locality",)),
+    ("York", ("locality", "county")),
+    ("Washington", ("region", "locality")),
+    ("Mexico", ("country",)),
+    ("Lima", ("locality",)),
+    ("Kent", ("county",)),
+    ("Nice", ("locality",)),
+]
+
+LIMIT = 20
+
+
+def run_query(db, query: str, mode: str, ranking: str) -> tuple:
+    """Fetch the top results for a query and return (latency in ms, rows)"""
+    start = time.perf_counter()
+    source, params = name_source(query, mode)
+    if ranking == "relevance":
+        score, score_params = relevance_score(query)
+        order_by = f"{score} DESC, name"
+        params = params + score_params
+    else:
+        order_by = "name"
+    rows = db.execute(
+        f"SELECT name_upper, subtype FROM {source} ORDER BY {order_by} LIMIT {LIMIT}",
+        params,
+    ).fetchall()
+    return (time.perf_counter() - start) * 1000, rows
+
+
+def answer_rank(rows: list, query: str, subtypes: tuple) -> int:
+    """1-based rank of the first expected answer, 0 if it is not in the results"""
+    for rank, (name_upper, subtype) in enumerate(rows, start=1):
+        if name_upper == query.upper() and subtype in subtypes:
+            return rank
+    return 0
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--db-path", default=os.environ.get("DUCKDB_PATH", "./divisions_index.duckdb")
+    )
+    parser.add_argument("--modes", default="scan,prefix,word")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--verbose", action="store_true", help="print per-query ranks")
+    args = parser.parse_args()
+
+    db = duckdb.connect(args.db_path, read_only=True)
+
+    print(
+        f"{'mode':>6} {'ranking':>9} {'p@1':>5} {'mrr':>6} {'found':>6} "
+        f"{'p50 ms':>9} {'p95 ms':>9}"
+    )
+    for mode in args.modes.split(","):
+        for ranking in ("name", "relevance"):
+            latencies = []
+            ranks = []
+            for query, subtypes in QUERIES:
+                for _ in range(args.repeat):
+                    latency, rows = run_query(db, query, mode, ranking)
+                    latencies.append(latency)
+                rank = answer_rank(rows, query, subtypes)
+                ranks.append(rank)
+                if args.verbose:
+                    print(f"    {mode:>6} {ranking:>9} {query!r}: rank {rank or '-'}")
+
+            precision_at_1 = sum(rank == 1 for rank in ranks) / len(ranks)
+            mrr = sum(1 / rank for rank in ranks if rank) / len(ranks)
+            print(
+                f"{mode:>6} {ranking:>9} {precision_at_1:>5.2f} {mrr:>6.3f} "
+                f"{sum(bool(rank) for rank in ranks):>3}/{len(ranks):<2} "
+                f"{statistics.median(latencies):>9.2f} {percentile(latencies, 95):>9.2f}"
+            )
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Load test /api/search and /api/geometry of a running server with a mixed workload
+
+Queries, viewports and ids are sampled from the same index the server reads,
+so searches return results and geometry ids exist. Each simulated user picks
+operations by weight from OPERATIONS until the duration is up; latency
+percentiles are reported per operation, plus overall throughput and errors.
+
+Usage:
+    python benchmarks/synthetic_divisions.py --countries 20 --build-db ./synthetic.duckdb --with-geometry
+    DUCKDB_PATH=./synthetic.duckdb gunicorn -c gunicorn.conf.py wsgi:app
+    python benchmarks/load_test_api.py --db-path ./synthetic.duckdb --users 8
+"""
+import argparse
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+import duckdb
+import requests
+
+# (operation, share of requests)
+OPERATIONS = [
+    ("search_name", 0.35),
+    ("search_prefix_bbox", 0.15),
+    ("search_word", 0.1),
+    ("search_relevance", 0.1),
+    ("geometry", 0.3),
+]
+
+
+class Workload:
+    """Request parameters sampled from the index"""
+
+    def __init__(self, db_path: str, sample_size: int, seed: int):
+        db = duckdb.connect(db_path, read_only=True)
+        # Ordering by a seeded hash rather than USING SAMPLE, which picks a
+        # different set of rows on every run; the same seed gives the same ids
+        self.divisions = db.execute(
+            """
+            SELECT id, name, bbox['xmin'], bbox['ymin'], bbox['xmax'], bbox['ymax']
+            FROM divisions_index
+            WHERE bbox IS NOT NULL
+            ORDER BY hash(id, ?), id
+            LIMIT ?
+        """,
+            [seed, sample_size],
+        ).fetchall()
+        db.close()
+        if not self.divisions:
+            raise Exception(f"No divisions found in {db_path}")
+        self.seed = seed
+
+    def rng(self, user: int) -> random.Random:
+        return random.Random(self.seed + user)
+
+    def query(self, rng: random.Random) -> str:
+        """A full name, a leading fragment of one, or one of its words"""
+        name = rng.choice(self.divisions)[1]
+        choice = rng.random()
+        if choice < 0.4:
+            return name
+        if choice < 0.8:
+            return name[: rng.randint(3, max(3, min(8, len(name))))]
+        return rng.choice(name.split())
+
+    def viewport(self, rng: random.Random) -> Dict[str, float]:
+        """A map viewport around a sampled division, a few times its size"""
+        _, _, xmin, ymin, xmax, ymax = rng.choice(self.divisions)
+        pad = max(xmax - xmin, ymax - ymin) * rng.uniform(1, 4)
+        return {
+            "west": xmin - pad,
+            "south": ymin - pad,
+            "east": xmax + pad,
+            "north": ymax + pad,
+        }
+
+    def request(self, operation: str, rng: random.Random) -> Tuple[str, str, Dict[str, Any]]:
+        """(method, path, json body or query params) for one operation"""
+        if operation == "geometry":
+            division_id = rng.choice(self.divisions)[0]
+            return "GET", f"/api/geometry/{division_id}", {"zoom": rng.randint(3, 14)}
+        body: Dict[str, Any] = {"query": self.query(rng), "filters": {}}
+        if operation == "search_prefix_bbox":
+            body.update(mode="prefix", bbox=self.viewport(rng))
+        elif operation == "search_word":
+            body["mode"] = "word"
+        elif operation == "search_relevance":
+            body.update(mode="prefix", ranking="relevance")
+        return "POST", "/api/search", body
+
+
+def run_users(
+    url: str, workload: Workload, users: int, duration: float, timeout: float
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """Run every user for `duration` seconds; return latencies, errors and elapsed time"""
+    names = [name for name, _ in OPERATIONS]
+    weights = [weight for _, weight in OPERATIONS]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(index: int):
+        rng = workload.rng(index)
+        session = requests.Session()
+        local: Dict[str, List[float]] = defaultdict(list)
+        local_errors: Dict[str, int] = defaultdict(int)
+        while time.perf_counter() < deadline:
+            operation = rng.choices(names, weights)[0]
+            method, path, payload = workload.request(operation, rng)
+            start = time.perf_counter()
+            try:
+                if method == "GET":
+                    response = session.get(url + path, params=payload, timeout=timeout)
+                else:
+                    response = session.post(url + path, json=payload, timeout=timeout)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if ok:
+                local[operation].append(elapsed_ms)
+            else:
+                local_errors[operation] += 1
+        session.close()
+        with lock:
+            for operation, values in local.items():
+                latencies[operation].extend(values)
+            for operation, count in local_errors.items():
+                errors[operation] += count
+
+    threads = [threading.Thread(target=user, args=(index,)) for index in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(latencies: Dict[str, List[float]], errors: Dict[str, int], seconds: float):
+    """Per-operation and overall latency percentiles and throughput"""
+    row = "{:>20} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9}".format
+    print(row("operation", "requests", "errors", "p50 ms", "p95 ms", "p99 ms", "req/s"))
+    rows = [
+        (operation, latencies.get(operation, []), errors.get(operation, 0))
+        for operation, _ in OPERATIONS
+    ]
+    all_values = [value for values in latencies.values() for value in values]
+    rows.append(("all", all_values, sum(errors.values())))
+    for operation, values, failed in rows:
+        if not values:
+            print(row(operation, 0, failed, "-", "-", "-", "-"))
+            continue
+        print(
+            row(
+                operation,
+                len(values),
+                failed,
+                f"{statistics.median(values):.2f}",
+                f"{percentile(values, 95):.2f}",
+                f"{percentile(values, 99):.2f}",
+                f"{len(values) / seconds:.0f}",
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--db-path", default=os.environ.get("DUCKDB_PATH", "./divisions_index.duckdb")
+    )
+    parser.add_argument("--url", default="http://localhost:4000")
+    parser.add_argument("--users", default="1,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unreported seconds first")
+    parser.add_argument("--sample", type=int, default=2000, help="Divisions to draw requests from")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workload = Workload(args.db_path, args.sample, args.seed)
+    url = args.url.rstrip("/")
+    if args.warmup:
+        run_users(url, workload, 1, args.warmup, args.timeout)
+
+    for users in [int(value) for value in args.users.split(",")]:
+        latencies, errors, seconds = run_users(
+            url, workload, users, args.duration, args.timeout
+        )
+        print(f"\n{users} users, {seconds:.1f}s")
+        report(latencies, errors, seconds)
+
+
+if __name__ == "__main__":
+    main()
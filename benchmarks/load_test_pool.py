@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Load test search throughput through the DuckDB connection pool across thread counts
+
+Compares the pool against a single connection shared behind a lock, which is how
+request threads used OvertureDataService.db before the pool.
+
+Usage:
+    python benchmarks/load_test_pool.py --db-path ./divisions_index.duckdb --threads 1,2,4,8
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import duckdb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from db_pool import ConnectionPool  # noqa: E402
+from search_index import name_source  # noqa: E402
+
+
+class SharedConnection:
+    """Baseline: every thread serializes on one connection"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            yield self._connection
+
+    def stats(self):
+        return {}
+
+
+def sample_queries(db, count: int, seed: int) -> list:
+    """A mix of 2-6 character prefixes of real names"""
+    rng = random.Random(seed)
+    names = [
+        row[0]
+        for row in db.execute(
+            "SELECT name_upper FROM divisions_index USING SAMPLE 1000 ROWS"
+        ).fetchall()
+    ]
+    return [name[: rng.randint(2, 6)] for name in rng.choices(names, k=count)]
+
+
+def run(pool, queries: list, threads: int, duration: float, mode: str) -> dict:
+    """Drive searches from several threads for a fixed duration"""
+    latencies = []
+    latencies_lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset: int):
+        local = []
+        i = offset
+        while time.monotonic() < deadline:
+            source, params = name_source(queries[i % len(queries)], mode)
+            start = time.perf_counter()
+            with pool.connection() as conn:
+                conn.execute(
+                    f"SELECT id, name, subtype FROM {source} ORDER BY name LIMIT 20",
+                    params,
+                ).fetchall()
+            local.append((time.perf_counter() - start) * 1000)
+            i += threads
+        with latencies_lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.monotonic()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(ordered) if ordered else 0.0,
+        "p95": ordered[int(0.95 * (len(ordered) - 1))] if ordered else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--db-path", default=os.environ.get("DUCKDB_PATH", "./divisions_index.duckdb")
+    )
+    parser.add_argument("--threads", default="1,2,4,8")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--mode", default="word", choices=("scan", "prefix", "word"))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    db = duckdb.connect(args.db_path, read_only=True)
+    queries = sample_queries(db, 500, args.seed)
+    print(f"CPUs available: {os.cpu_count()}, mode: {args.mode}")
+    print(
+        f"{'threads':>7} {'backend':>7} {'req/s':>9} {'scaling':>8} {'p50 ms':>8} {'p95 ms':>8} {'pool waits':>10}"
+    )
+
+    baselines = {}
+    for threads in [int(value) for value in args.threads.split(",")]:
+        for name, pool in (
+            ("shared", SharedConnection(db)),
+            ("pool", ConnectionPool(db, size=threads, timeout=30)),
+        ):
+            result = run(pool, queries, threads, args.duration, args.mode)
+            baselines.setdefault(name, result["throughput"])
+            print(
+                f"{threads:>7} {name:>7} {result['throughput']:>9.1f} "
+                f"{result['throughput'] / baselines[name]:>7.2f}x "
+                f"{result['p50']:>8.2f} {result['p95']:>8.2f} "
+                f"{pool.stats().get('waits', '-'):>10}"
+            )
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic Overture division_area dataset for offline benchmarks
+
+Countries contain regions, regions contain counties and counties contain
+localities, each a star-shaped polygon inside its parent with a vertex count
+drawn per subtype, so bbox filters, geometry sizes and simplification behave
+like real boundaries. Names are built from syllables with a shared pool of
+common names repeated across countries, as real place names are. Columns match
+the ones build_index.py reads, including `version`, so `--bump-fraction`
+produces a second release for exercising incremental builds. Areas are written
+under type=division_area and the matching `division` features, which carry
+each division's parent, under type=division, as in an Overture release.
+
+Usage:
+    python benchmarks/synthetic_divisions.py --output-dir ./benchmarks/data/synthetic --countries 20
+    python benchmarks/synthetic_divisions.py --countries 20 --build-db ./synthetic.duckdb --with-geometry
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import duckdb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from build_index import build_divisions_index  # noqa: E402
+
+# (subtype, class, children per parent, median vertices, child radius / parent radius)
+LEVELS = [
+    ("country", "land", None, 2000, None),
+    ("region", "land", 8, 800, 0.3),
+    ("county", "land", 10, 250, 0.28),
+    ("locality", "city", 12, 60, 0.2),
+]
+
+# Radius (degrees) of a country polygon
+COUNTRY_RADIUS = 8.0
+
+MAX_VERTICES = 20_000
+
+SYLLABLES = [
+    "al", "an", "ar", "bel", "ber", "bra", "ca", "cor", "dan", "del", "dor", "el",
+    "fen", "gar", "ham", "hol", "is", "kel", "kin", "la", "lin", "mar", "mon", "nor",
+    "os", "par", "ril", "ros", "san", "sel", "sto", "tam", "ter", "val", "ven", "wick",
+]
+PREFIXES = ["", "", "", "", "North ", "South ", "East ", "West ", "New ", "Port ", "San ", "Saint "]
+SUFFIXES = {
+    "region": ["", "", " Province", " State"],
+    "county": [" County", " County", " District", ""],
+    "locality": ["", "", "", "ville", "ton", " Heights", " Springs", "burg"],
+}
+# Repeated across the dataset so searches hit many same-named divisions
+COMMON_NAMES = [
+    "Springfield", "Riverside", "Franklin", "Georgetown", "Clinton", "Salem",
+    "Fairview", "Madison", "Greenville", "Kingston", "Victoria", "Santa Cruz",
+]
+COMMON_NAME_SHARE = 0.05
+
+CSV_COLUMNS = [
+    "id", "division_id", "parent_division_id", "version", "name", "subtype", "class",
+    "country", "region", "xmin", "ymin", "xmax", "ymax", "geometry",
+]
+
+
+def make_name(rng: random.Random, subtype: str) -> str:
+    """Pronounceable place name, sometimes one of the shared common names"""
+    if subtype == "locality" and rng.random() < COMMON_NAME_SHARE:
+        return rng.choice(COMMON_NAMES)
+    stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    if subtype == "country":
+        return stem + rng.choice(["ia", "land", "stan", ""])
+    return rng.choice(PREFIXES) + stem + rng.choice(SUFFIXES[subtype])
+
+
+def vertex_count(rng: random.Random, median: int) -> int:
+    """Log-normally distributed vertex count, so a few shapes are very detailed"""
+    return max(4, min(MAX_VERTICES, int(rng.lognormvariate(math.log(median), 0.8))))
+
+
+def polygon_wkb(
+    rng: random.Random, center: Tuple[float, float], radius: float, vertices: int
+) -> Tuple[bytes, Tuple[float, float, float, float]]:
+    """Little-endian WKB of a star-shaped polygon, with its (xmin, ymin, xmax, ymax)"""
+    cx, cy = center
+    coords = []
+    # Smooth radial noise, so the outline looks like a boundary rather than a burst
+    phases = [rng.uniform(0, 2 * math.pi) for _ in range(3)]
+    for k in range(vertices):
+        angle = 2 * math.pi * k / vertices
+        wobble = sum(
+            math.sin(angle * (index + 2) + phase) / (index + 2)
+            for index, phase in enumerate(phases)
+        )
+        r = radius * (0.8 + 0.15 * wobble + 0.03 * rng.random())
+        coords.append(
+            (
+                max(-180.0, min(180.0, cx + r * math.cos(angle))),
+                max(-90.0, min(90.0, cy + r * math.sin(angle))),
+            )
+        )
+    coords.append(coords[0])
+    xs = [x for x, _ in coords]
+    ys = [y for _, y in coords]
+    flat = [value for point in coords for value in point]
+    # byte order 1 (little endian), type 3 (Polygon), one ring
+    wkb = struct.pack("<BIII", 1, 3, 1, len(coords)) + struct.pack(f"<{len(flat)}d", *flat)
+    return wkb, (min(xs), min(ys), max(xs), max(ys))
+
+
+def generate_rows(
+    countries: int, seed: int, bump_fraction: float
+) -> Iterator[List]:
+    """CSV rows for every division, parents before their children"""
+    rng = random.Random(seed)
+    # Versions are drawn from their own stream so bumping them leaves every
+    # name and shape identical to the unbumped dataset
+    version_rng = random.Random(seed + 1)
+    serial = 0
+
+    def emit(
+        level: int,
+        center,
+        radius: float,
+        country: str,
+        region: Optional[str],
+        parent_id: Optional[str],
+    ) -> Iterator[List]:
+        nonlocal serial
+        subtype, division_class, _, median_vertices, _ = LEVELS[level]
+        serial += 1
+        if subtype == "region":
+            # ISO 3166-2 style code, inherited by everything inside the region
+            region = f"{country}-{serial % 1000:03d}"
+        wkb, (xmin, ymin, xmax, ymax) = polygon_wkb(
+            rng, center, radius, vertex_count(rng, median_vertices)
+        )
+        version = 2 if version_rng.random() < bump_fraction else 1
+        division_id = f"division-{serial:08d}"
+        yield [
+            f"area-{serial:08d}", division_id, parent_id, version,
+            make_name(rng, subtype), subtype, division_class, country, region,
+            xmin, ymin, xmax, ymax, wkb.hex(),
+        ]
+        if level + 1 == len(LEVELS):
+            return
+        _, _, children, _, child_scale = LEVELS[level + 1]
+        for _ in range(children):
+            # Child centers stay well inside the parent outline
+            angle = rng.uniform(0, 2 * math.pi)
+            distance = rng.uniform(0, 0.55) * radius
+            child_center = (
+                center[0] + distance * math.cos(angle),
+                center[1] + distance * math.sin(angle),
+            )
+            child_radius = radius * child_scale * rng.uniform(0.7, 1.2)
+            yield from emit(
+                level + 1, child_center, child_radius, country, region, division_id
+            )
+
+    # Countries on a coarse grid over the inhabited latitudes
+    columns = max(1, int(math.sqrt(countries * 2)))
+    for index in range(countries):
+        center = (
+            -170 + (index % columns + 0.5) * 340 / columns,
+            -55 + (index // columns + 0.5) * 120 / math.ceil(countries / columns),
+        )
+        country = f"{chr(65 + index // 26 % 26)}{chr(65 + index % 26)}"
+        yield from emit(0, center, min(COUNTRY_RADIUS, 150 / columns), country, None, None)
+
+
+def write_parquet(
+    output_dir: str, countries: int, files: int, seed: int, bump_fraction: float
+) -> int:
+    """Write the areas and divisions as `files` parquet files each; return the row count"""
+    area_dir = os.path.join(output_dir, "type=division_area")
+    division_dir = os.path.join(output_dir, "type=division")
+    os.makedirs(area_dir, exist_ok=True)
+    os.makedirs(division_dir, exist_ok=True)
+    db = duckdb.connect()
+    rows = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        csv_paths = [os.path.join(scratch, f"part-{index}.csv") for index in range(files)]
+        handles = [open(path, "w", newline="") for path in csv_paths]
+        writers = [csv.writer(handle) for handle in handles]
+        for writer in writers:
+            writer.writerow(CSV_COLUMNS)
+        for row in generate_rows(countries, seed, bump_fraction):
+            # Round-robin keeps every file a mix of subtypes and regions
+            writers[rows % files].writerow(row)
+            rows += 1
+        for handle in handles:
+            handle.close()
+
+        for index, csv_path in enumerate(csv_paths):
+            db.execute(
+                f"""
+                CREATE OR REPLACE TEMP VIEW part AS
+                SELECT * FROM read_csv('{csv_path}', header = true, columns = {{
+                    'id': 'VARCHAR', 'division_id': 'VARCHAR', 'parent_division_id': 'VARCHAR',
+                    'version': 'INTEGER', 'name': 'VARCHAR', 'subtype': 'VARCHAR',
+                    'class': 'VARCHAR', 'country': 'VARCHAR', 'region': 'VARCHAR',
+                    'xmin': 'DOUBLE', 'ymin': 'DOUBLE', 'xmax': 'DOUBLE', 'ymax': 'DOUBLE',
+                    'geometry': 'VARCHAR'
+                }})
+            """
+            )
+            names = "{'primary': name, 'common': CAST(NULL AS MAP(VARCHAR, VARCHAR))}"
+            area_path = os.path.join(area_dir, f"part-{index:05d}.parquet")
+            db.execute(
+                f"""
+                COPY (
+                    SELECT
+                        id,
+                        CAST(version AS INTEGER) AS version,
+                        {names} AS "names",
+                        subtype,
+                        class,
+                        country,
+                        region,
+                        division_id,
+                        {{
+                            'xmin': CAST(xmin AS FLOAT), 'xmax': CAST(xmax AS FLOAT),
+                            'ymin': CAST(ymin AS FLOAT), 'ymax': CAST(ymax AS FLOAT)
+                        }} AS bbox,
+                        unhex(geometry) AS geometry
+                    FROM part
+                ) TO '{area_path}' (FORMAT PARQUET)
+            """
+            )
+            division_path = os.path.join(division_dir, f"part-{index:05d}.parquet")
+            db.execute(
+                f"""
+                COPY (
+                    SELECT
+                        division_id AS id,
+                        CAST(version AS INTEGER) AS version,
+                        {names} AS "names",
+                        subtype,
+                        country,
+                        region,
+                        parent_division_id
+                    FROM part
+                ) TO '{division_path}' (FORMAT PARQUET)
+            """
+            )
+    db.close()
+    return rows
+
+
+def dataset_size(countries: int) -> int:
+    """Divisions generated for a number of countries"""
+    per_country, width = 1, 1
+    for _, _, children, _, _ in LEVELS[1:]:
+        width *= children
+        per_country += width
+    return countries * per_country
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output-dir", default="./benchmarks/data/synthetic")
+    parser.add_argument(
+        "--countries",
+        type=int,
+        default=10,
+        help=f"Scale of the dataset; each country adds {dataset_size(1)} divisions",
+    )
+    parser.add_argument("--files", type=int, default=8, help="Parquet files to split rows over")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--bump-fraction",
+        type=float,
+        default=0.0,
+        help="Share of divisions given version 2, to simulate a new release",
+    )
+    parser.add_argument("--build-db", help="Also build a divisions index at this path")
+    parser.add_argument("--with-geometry", action="store_true")
+    parser.add_argument("--release", default="synthetic")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = write_parquet(
+        args.output_dir, args.countries, args.files, args.seed, args.bump_fraction
+    )
+    print(
+        f"Wrote {rows} divisions to {args.files} files in {args.output_dir} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+    if args.build_db:
+        build_divisions_index(
+            args.build_db,
+            source=os.path.join(args.output_dir, "type=division_area", "*.parquet"),
+            with_geometry=args.with_geometry,
+            release=args.release,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,94 +2,961 @@
 """
 Script to pre-build the DuckDB index for faster deployment
 """
+import argparse
 import duckdb
+import json
 import os
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_DB_PATH = "./divisions_index.duckdb"
+DEFAULT_RELEASE = "2025-06-25.0"
+SOURCE_TEMPLATE = "s3://overturemaps-us-west-2/release/{release}/theme=divisions/type=division_area/*.parquet"
+DEFAULT_SOURCE = SOURCE_TEMPLATE.format(release=DEFAULT_RELEASE)
 
-def build_divisions_index():
-    """Build the divisions index and save it to a database file"""
-    try:
-        # Connect to database file
-        db_path = "./divisions_index.duckdb"
-
-        # Remove existing database if it exists
-        if os.path.exists(db_path):
-            os.remove(db_path)
-            logger.info(f"Removed existing database at {db_path}")
-
-        db = duckdb.connect(db_path)
-        logger.info(f"Created new database at {db_path}")
-
-        # Install required extensions
-        logger.info("Installing DuckDB extensions...")
-        db.execute("INSTALL spatial;")
-        db.execute("LOAD spatial;")
-        db.execute("INSTALL httpfs;")
-        db.execute("LOAD httpfs;")
-
-        # Configure AWS settings for accessing Overture data
-        db.execute("SET s3_region='us-west-2';")
-        db.execute("SET s3_access_key_id='';")
-        db.execute("SET s3_secret_access_key='';")
-
-        logger.info("Creating lightweight divisions index (metadata only)...")
-
-        # Create a lightweight table with just search metadata and IDs
-        # Geometry will be fetched on-demand using the ID
-        db.execute(
-            """
-            CREATE TABLE divisions_index AS 
-            SELECT 
+# Path segment of division_area files; the `division` features that hold each
+# division's parent live next to them under type=division
+AREA_TYPE_SEGMENT = "type=division_area"
+DIVISION_TYPE_SEGMENT = "type=division"
+
+# Parallel partitions the parquet files are split into while loading
+DEFAULT_WORKERS = 4
+
+# Deepest quadtree level used to cluster the spatial index (cells of ~0.005 degrees)
+SPATIAL_MAX_LEVEL = 16
+
+# Features whose bbox only fits cells coarser than this level (~5.6 degrees) are
+# clustered separately from the Morton-ordered small features
+SPATIAL_LARGE_LEVEL = 6
+
+# Cells per axis of the coarse density grid used for spatial selectivity estimates
+SPATIAL_GRID_SIZE = 256
+
+# Build-time share of the relevance score by division subtype; the bbox area
+# adds up to IMPORTANCE_AREA_WEIGHT on top so larger places of a kind rank first
+SUBTYPE_IMPORTANCE = {
+    "country": 1.0,
+    "dependency": 0.9,
+    "region": 0.8,
+    "county": 0.6,
+    "localadmin": 0.5,
+    "locality": 0.5,
+    "macrohood": 0.3,
+    "neighborhood": 0.2,
+    "microhood": 0.1,
+}
+IMPORTANCE_AREA_WEIGHT = 0.5
+
+# Bound on ancestor path length, so a parent cycle in the source data cannot
+# make the recursive hierarchy query run forever
+MAX_HIERARCHY_DEPTH = 16
+
+# Simplification tolerances (degrees) for the precomputed geometry pyramid.
+# Level 0 matches the tolerance the geometry endpoint used to apply per request.
+LOD_TOLERANCES = [0.00001, 0.0001, 0.001, 0.01, 0.05]
+
+
+def source_for_release(release: str) -> str:
+    """division_area parquet glob of an Overture release on S3"""
+    return SOURCE_TEMPLATE.format(release=release)
+
+
+def division_source_for(source: str) -> Optional[str]:
+    """division parquet glob alongside a division_area source, or None if it has no such layout"""
+    if AREA_TYPE_SEGMENT not in source:
+        return None
+    return source.replace(AREA_TYPE_SEGMENT, DIVISION_TYPE_SEGMENT)
+
+
+def importance_expression() -> str:
+    """SQL for the static part of a division's relevance score
+
+    Subtype weight from SUBTYPE_IMPORTANCE plus up to IMPORTANCE_AREA_WEIGHT
+    for the bbox area, log scaled from ~1e-6 square degrees to the whole world.
+    """
+    subtype_cases = " ".join(
+        f"WHEN {_sql_string(subtype)} THEN {weight}"
+        for subtype, weight in SUBTYPE_IMPORTANCE.items()
+    )
+    area = (
+        "(CAST(bbox['xmax'] AS DOUBLE) - CAST(bbox['xmin'] AS DOUBLE))"
+        " * (CAST(bbox['ymax'] AS DOUBLE) - CAST(bbox['ymin'] AS DOUBLE))"
+    )
+    return f"""CAST(
+        CASE subtype {subtype_cases} ELSE 0.1 END
+        + COALESCE({IMPORTANCE_AREA_WEIGHT} * LEAST(1.0, GREATEST(0.0,
+            (LOG10(GREATEST({area}, 1e-12)) + 6) / 11
+        )), 0.0)
+    AS FLOAT)"""
+
+
+def _is_remote(source: str) -> bool:
+    """Return True if the parquet source needs httpfs to be read"""
+    return source.startswith(("s3://", "http://", "https://"))
+
+
+def _sql_string(value: str) -> str:
+    """Quote a value as a SQL string literal"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+class StageTimer:
+    """Wall clock time and throughput of each build stage"""
+
+    def __init__(self):
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Time a with block; set "rows" on the yielded dict to report rows/sec"""
+        logger.info(f"Stage {name} started")
+        stats: Dict[str, Any] = {}
+        start = time.monotonic()
+        yield stats
+        seconds = time.monotonic() - start
+        stats["seconds"] = round(seconds, 3)
+        message = f"Stage {name} finished in {seconds:.1f}s"
+        if "rows" in stats:
+            stats["rows_per_second"] = round(stats["rows"] / seconds) if seconds else None
+            message += f", {stats['rows']} rows ({stats['rows_per_second']} rows/s)"
+        self.timings[name] = stats
+        logger.info(message)
+
+
+def _parquet_list(files: List[str]) -> str:
+    """SQL list literal of parquet paths for read_parquet"""
+    return "[" + ", ".join(_sql_string(path) for path in files) + "]"
+
+
+def list_source_files(db, source: str) -> List[str]:
+    """Expand the source glob into the parquet files it matches"""
+    files = [
+        row[0]
+        for row in db.execute(f"SELECT file FROM glob({_sql_string(source)}) ORDER BY file").fetchall()
+    ]
+    if not files:
+        raise Exception(f"No parquet files match {source}")
+    return files
+
+
+def partition_files(files: List[str], workers: int) -> List[List[str]]:
+    """Split files round-robin into at most `workers` non-empty partitions"""
+    partitions = [files[i::workers] for i in range(max(1, workers))]
+    return [partition for partition in partitions if partition]
+
+
+def parallel_insert(
+    db, table: str, select_sql: Callable[[str], str], partitions: List[List[str]]
+):
+    """Append select_sql(<parquet file list>) into table, one cursor per partition
+
+    Each cursor is its own connection to the database, so the partitions are
+    read and decoded concurrently and their appends commit independently.
+    """
+
+    def load(files: List[str]):
+        cursor = db.cursor()
+        try:
+            cursor.execute(f"INSERT INTO {table} {select_sql(_parquet_list(files))}")
+        finally:
+            cursor.close()
+
+    with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+        list(executor.map(load, partitions))
+
+
+def load_divisions(db, partitions: List[List[str]]):
+    """Load the search columns of every named division into divisions_staging"""
+
+    def select_sql(file_list: str) -> str:
+        return f"""
+            SELECT
                 id,
+                version,
                 CAST(names['primary'] AS VARCHAR) as name,
                 UPPER(CAST(names['primary'] AS VARCHAR)) as name_upper,
                 subtype,
                 CAST(names['common'] AS VARCHAR) as common_name,
                 country,
-                bbox
-            FROM read_parquet('s3://overturemaps-us-west-2/release/2025-06-25.0/theme=divisions/type=division_area/*.parquet')
+                bbox,
+                division_id,
+                class,
+                filename,
+                file_row_number
+            FROM read_parquet({file_list}, filename = true, file_row_number = true)
             WHERE names['primary'] IS NOT NULL
             AND LENGTH(CAST(names['primary'] AS VARCHAR)) > 0
         """
+
+    # Take the schema from the first partition, then fill from all of them
+    db.execute(f"CREATE TABLE divisions_staging AS {select_sql(_parquet_list(partitions[0]))} LIMIT 0")
+    parallel_insert(db, "divisions_staging", select_sql, partitions)
+
+
+def load_division_parents(db, partitions: List[List[str]]):
+    """Load the parent link of every division into division_parents"""
+
+    def select_sql(file_list: str) -> str:
+        return f"""
+            SELECT
+                id AS division_id,
+                parent_division_id,
+                subtype,
+                CAST(names['primary'] AS VARCHAR) AS name
+            FROM read_parquet({file_list})
+        """
+
+    db.execute(f"CREATE TABLE division_parents AS {select_sql(_parquet_list(partitions[0]))} LIMIT 0")
+    parallel_insert(db, "division_parents", select_sql, partitions)
+
+
+def build_hierarchy(db):
+    """Build region labels and the children and ancestor tables from division_parents
+
+    Hierarchy links are between divisions, while the API and search results
+    use division_area ids, so every division is represented by one of its
+    areas, the land one when it has several. Both tables hold only id pairs,
+    sorted by the id they are looked up by; the backend reads the matching
+    rows of divisions_index by its indexed id.
+    """
+    logger.info("Creating division hierarchy...")
+
+    # Every (division, ancestor) pair with its distance, walking parent links
+    db.execute(
+        f"""
+        CREATE TEMP TABLE division_paths AS
+        WITH RECURSIVE paths(division_id, depth, ancestor_id) AS (
+            SELECT division_id, 1, parent_division_id
+            FROM division_parents
+            WHERE parent_division_id IS NOT NULL
+            UNION ALL
+            SELECT paths.division_id, paths.depth + 1, parent.parent_division_id
+            FROM paths
+            JOIN division_parents parent ON parent.division_id = paths.ancestor_id
+            WHERE parent.parent_division_id IS NOT NULL
+            AND paths.depth < {MAX_HIERARCHY_DEPTH}
+        )
+        SELECT * FROM paths
+    """
+    )
+
+    # "<state>, <country>" from the nearest region and country ancestors, kept
+    # until divisions_index has copied it
+    db.execute(
+        """
+        CREATE TEMP TABLE division_region_labels AS
+        SELECT
+            paths.division_id,
+            NULLIF(concat_ws(', ',
+                arg_min(ancestor.name, paths.depth) FILTER (WHERE ancestor.subtype = 'region'),
+                arg_min(ancestor.name, paths.depth) FILTER (WHERE ancestor.subtype = 'country')
+            ), '') AS region_label
+        FROM division_paths paths
+        JOIN division_parents ancestor ON ancestor.division_id = paths.ancestor_id
+        GROUP BY paths.division_id
+    """
+    )
+
+    # The area standing in for each division
+    db.execute(
+        """
+        CREATE TEMP TABLE division_members AS
+        SELECT
+            division_id,
+            COALESCE(MIN(id) FILTER (WHERE class = 'land'), MIN(id)) AS id
+        FROM divisions_staging
+        WHERE division_id IS NOT NULL
+        GROUP BY division_id
+    """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE division_children AS
+        SELECT parent.id AS parent_id, child.id AS child_id
+        FROM division_parents link
+        JOIN division_members parent ON parent.division_id = link.parent_division_id
+        JOIN division_members child ON child.division_id = link.division_id
+        ORDER BY parent_id, child_id
+    """
+    )
+    db.execute("CREATE INDEX idx_children_parent ON division_children(parent_id)")
+
+    db.execute(
+        """
+        CREATE TABLE division_ancestors AS
+        SELECT
+            descendant.id AS descendant_id,
+            CAST(paths.depth AS TINYINT) AS depth,
+            ancestor.id AS ancestor_id
+        FROM division_paths paths
+        JOIN division_members descendant ON descendant.division_id = paths.division_id
+        JOIN division_members ancestor ON ancestor.division_id = paths.ancestor_id
+        ORDER BY descendant_id, depth
+    """
+    )
+    db.execute("CREATE INDEX idx_ancestors_descendant ON division_ancestors(descendant_id)")
+
+    db.execute("DROP TABLE division_paths")
+    db.execute("DROP TABLE division_members")
+    db.execute("DROP TABLE division_parents")
+
+    row_count = db.execute("SELECT COUNT(*) FROM division_children").fetchone()[0]
+    logger.info(f"Division hierarchy created with {row_count} parent-child links")
+    return row_count
+
+
+def build_name_index(db):
+    """Build the sorted word-prefix table used for indexed name searches"""
+    logger.info("Creating word-prefix name index...")
+
+    # One row per word start of each name: the term is the rest of the name from
+    # that word on, so any word-prefix query is a range scan over the sorted
+    # terms. Search columns are copied in so a lookup never joins back.
+    db.execute(
+        """
+        CREATE TABLE divisions_name_terms AS
+        SELECT
+            substring(name_upper, pos) AS term,
+            id,
+            name,
+            name_upper,
+            subtype,
+            common_name,
+            country,
+            bbox,
+            importance,
+            region_label
+        FROM (
+            SELECT
+                *,
+                unnest(list_filter(
+                    range(1, length(name_upper) + 1),
+                    p -> p = 1 OR substring(name_upper, p - 1, 1) IN (' ', '-', '(', '/')
+                )) AS pos
+            FROM divisions_index
+        )
+        ORDER BY term
+    """
+    )
+
+    row_count = db.execute("SELECT COUNT(*) FROM divisions_name_terms").fetchone()[0]
+    logger.info(f"Word-prefix name index created with {row_count} terms")
+
+
+def build_spatial_index(db):
+    """Build the bbox table clustered by size class and Morton order of the bbox center"""
+    logger.info("Creating spatial index...")
+
+    # Interleave the bits of two 16-bit cell coordinates into a Morton (Z-order) key
+    db.execute("CREATE TEMP MACRO spread_1(v) AS (v | (v << 8)) & 16711935")
+    db.execute("CREATE TEMP MACRO spread_2(v) AS (v | (v << 4)) & 252645135")
+    db.execute("CREATE TEMP MACRO spread_3(v) AS (v | (v << 2)) & 858993459")
+    db.execute("CREATE TEMP MACRO spread_4(v) AS (v | (v << 1)) & 1431655765")
+    db.execute(
+        """
+        CREATE TEMP MACRO morton_key(x, y) AS
+            spread_4(spread_3(spread_2(spread_1(x))))
+            | (spread_4(spread_3(spread_2(spread_1(y)))) << 1)
+    """
+    )
+
+    # Rows are ordered by the Morton key of their bbox center, so the min/max
+    # stats of the flattened bbox columns are tight and the overlap filter skips
+    # most of the table. grid_level is the finest quadtree level whose cells are
+    # at least as large as the bbox; features coarser than SPATIAL_LARGE_LEVEL
+    # (countries, large regions) are stored first so their wide bboxes do not
+    # widen the stats of the small features around them.
+    db.execute(
+        f"""
+        CREATE TABLE divisions_spatial AS
+        WITH flattened AS (
+            SELECT
+                id,
+                name,
+                name_upper,
+                subtype,
+                common_name,
+                country,
+                bbox,
+                importance,
+                region_label,
+                CAST(bbox['xmin'] AS DOUBLE) AS xmin,
+                CAST(bbox['ymin'] AS DOUBLE) AS ymin,
+                CAST(bbox['xmax'] AS DOUBLE) AS xmax,
+                CAST(bbox['ymax'] AS DOUBLE) AS ymax
+            FROM divisions_index
+            WHERE bbox IS NOT NULL
+        )
+        SELECT
+            *,
+            CAST(LEAST({SPATIAL_MAX_LEVEL}, GREATEST(0, FLOOR(LOG2(
+                360.0 / GREATEST(xmax - xmin, ymax - ymin, 1e-9)
+            )))) AS TINYINT) AS grid_level,
+            morton_key(
+                CAST(LEAST(65535, FLOOR(((xmin + xmax) / 2 + 180) / 360 * 65536)) AS BIGINT),
+                CAST(LEAST(65535, FLOOR(((ymin + ymax) / 2 + 90) / 180 * 65536)) AS BIGINT)
+            ) AS cell_key
+        FROM flattened
+        ORDER BY grid_level >= {SPATIAL_LARGE_LEVEL}, cell_key
+    """
+    )
+
+    # Feature counts per coarse cell of the bbox center, used by the search
+    # planner to estimate how many rows a viewport filter keeps
+    db.execute(
+        f"""
+        CREATE TABLE divisions_spatial_grid AS
+        SELECT
+            CAST(LEAST({SPATIAL_GRID_SIZE - 1}, FLOOR(((xmin + xmax) / 2 + 180) / 360 * {SPATIAL_GRID_SIZE})) AS INTEGER) AS cell_x,
+            CAST(LEAST({SPATIAL_GRID_SIZE - 1}, FLOOR(((ymin + ymax) / 2 + 90) / 180 * {SPATIAL_GRID_SIZE})) AS INTEGER) AS cell_y,
+            COUNT(*) AS row_count
+        FROM divisions_spatial
+        GROUP BY cell_x, cell_y
+    """
+    )
+
+    row_count = db.execute("SELECT COUNT(*) FROM divisions_spatial").fetchone()[0]
+    logger.info(f"Spatial index created with {row_count} entries")
+
+
+def fetch_changed_geometry(db, workers: int):
+    """Append the geometry of divisions_changed into division_geometry_fetched
+
+    Only the row groups that hold a changed division are read. The load
+    recorded each division's file and row number; the file footers give the
+    row ranges of their row groups, and each run of touched row groups is read
+    with a file_row_number range, which the parquet scan uses to skip the
+    other row groups. A semi-join on id alone is not pushed into the scan, and
+    DuckDB does not push an OR of ranges either, hence one read per run.
+    """
+    files = [
+        row[0]
+        for row in db.execute(
+            """
+            SELECT DISTINCT filename FROM division_source_rows
+            WHERE id IN (SELECT id FROM divisions_changed)
+            ORDER BY filename
+        """
+        ).fetchall()
+    ]
+    ranges = []
+    if files:
+        ranges = db.execute(
+            f"""
+            WITH row_groups AS (
+                SELECT
+                    file_name,
+                    row_group_id,
+                    SUM(row_group_num_rows) OVER (
+                        PARTITION BY file_name ORDER BY row_group_id
+                    ) - row_group_num_rows AS first_row,
+                    row_group_num_rows
+                FROM (
+                    SELECT DISTINCT file_name, row_group_id, row_group_num_rows
+                    FROM parquet_metadata({_parquet_list(files)})
+                )
+            ),
+            touched AS (
+                SELECT DISTINCT
+                    g.file_name,
+                    g.row_group_id,
+                    g.first_row,
+                    g.first_row + g.row_group_num_rows - 1 AS last_row
+                FROM divisions_changed c
+                JOIN division_source_rows f USING (id)
+                JOIN row_groups g
+                    ON g.file_name = f.filename
+                    AND f.file_row_number BETWEEN g.first_row
+                        AND g.first_row + g.row_group_num_rows - 1
+            )
+            SELECT file_name, MIN(first_row), MAX(last_row)
+            FROM (
+                SELECT
+                    *,
+                    row_group_id - ROW_NUMBER() OVER (
+                        PARTITION BY file_name ORDER BY row_group_id
+                    ) AS run
+                FROM touched
+            )
+            GROUP BY file_name, run
+            ORDER BY file_name, MIN(first_row)
+        """
+        ).fetchall()
+    logger.info(
+        f"Fetching changed geometry from {len(ranges)} row group ranges in {len(files)} parquet files"
+    )
+
+    def fetch(row_range: Tuple[str, int, int]):
+        path, first_row, last_row = row_range
+        cursor = db.cursor()
+        try:
+            cursor.execute(
+                f"""
+                INSERT INTO division_geometry_fetched
+                SELECT id, geometry
+                FROM read_parquet({_sql_string(path)}, file_row_number = true)
+                WHERE file_row_number BETWEEN {int(first_row)} AND {int(last_row)}
+                AND id IN (SELECT id FROM divisions_changed)
+                AND geometry IS NOT NULL
+            """
+            )
+        finally:
+            cursor.close()
+
+    if ranges:
+        with ThreadPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+            list(executor.map(fetch, ranges))
+
+
+def build_geometry_store(db, partitions: List[List[str]], incremental: bool = False):
+    """Materialize division geometry as WKB in a local table keyed by id
+
+    An incremental build only fetches geometry for divisions_changed and copies
+    the rest from the previous database.
+    """
+    logger.info("Creating local geometry store (WKB, clustered by id)...")
+
+    db.execute("CREATE TABLE division_geometry_fetched (id VARCHAR, geometry BLOB)")
+    if incremental:
+        fetch_changed_geometry(db, len(partitions))
+    else:
+        parallel_insert(
+            db,
+            "division_geometry_fetched",
+            lambda file_list: f"""
+                SELECT id, geometry
+                FROM read_parquet({file_list})
+                WHERE id IN (SELECT id FROM divisions_index)
+                AND geometry IS NOT NULL
+            """,
+            partitions,
+        )
+    fetched = db.execute("SELECT COUNT(*) FROM division_geometry_fetched").fetchone()[0]
+
+    kept = ""
+    if incremental:
+        kept = """
+            SELECT id, geometry FROM previous.division_geometry
+            WHERE id IN (SELECT id FROM divisions_index)
+            AND id NOT IN (SELECT id FROM divisions_changed)
+            UNION ALL
+        """
+
+    # Sorting by id keeps each row group's min/max id tight, so a point lookup
+    # only has to touch a single row group even without the ART index
+    db.execute(
+        f"""
+        CREATE TABLE division_geometry AS
+        SELECT id, geometry FROM (
+            {kept}
+            SELECT id, geometry FROM division_geometry_fetched
+        )
+        ORDER BY id
+    """
+    )
+    db.execute("CREATE INDEX idx_geometry_id ON division_geometry(id)")
+
+    row_count = db.execute("SELECT COUNT(*) FROM division_geometry").fetchone()[0]
+    logger.info(
+        f"Geometry store created with {row_count} entries ({fetched} fetched from the source)"
+    )
+    return fetched
+
+
+def build_geometry_lods(db, tolerances: list = LOD_TOLERANCES, incremental: bool = False):
+    """Precompute simplified WKB geometry per division for each tolerance level
+
+    An incremental build only simplifies the geometry fetched for this build,
+    as long as the previous database used the same tolerances.
+    """
+    logger.info(f"Precomputing simplified geometry levels {tolerances}...")
+
+    levels = list(enumerate(tolerances))
+    if incremental:
+        previous_levels = db.execute(
+            "SELECT lod, tolerance FROM previous.division_geometry_lod_levels ORDER BY lod"
+        ).fetchall()
+        if [tuple(level) for level in previous_levels] != levels:
+            logger.info("Simplification levels changed, recomputing every geometry")
+            incremental = False
+
+    db.execute(
+        "CREATE TABLE division_geometry_lod_levels (lod TINYINT, tolerance DOUBLE)"
+    )
+    db.executemany(
+        "INSERT INTO division_geometry_lod_levels VALUES (?, ?)",
+        levels,
+    )
+
+    source = "division_geometry_fetched" if incremental else "division_geometry"
+    kept = ""
+    if incremental:
+        kept = """
+            SELECT id, lod, geometry FROM previous.division_geometry_lod
+            WHERE id IN (SELECT id FROM division_geometry)
+            AND id NOT IN (SELECT id FROM division_geometry_fetched)
+            UNION ALL
+        """
+
+    # A coarser level is only stored when it actually drops vertices; readers
+    # pick the finest stored level at or below the requested one, so small
+    # shapes keep a single row instead of identical copies
+    db.execute(
+        f"""
+        CREATE TABLE division_geometry_lod AS
+        WITH simplified AS (
+            SELECT
+                g.id,
+                l.lod,
+                ST_SimplifyPreserveTopology(ST_GeomFromWKB(g.geometry), l.tolerance) AS geom
+            FROM {source} g
+            CROSS JOIN division_geometry_lod_levels l
+        ),
+        counted AS (
+            SELECT
+                id,
+                lod,
+                geom,
+                ST_NPoints(geom) AS npoints,
+                LAG(ST_NPoints(geom)) OVER (PARTITION BY id ORDER BY lod) AS prev_npoints
+            FROM simplified
+        )
+        SELECT id, lod, geometry FROM (
+            {kept}
+            SELECT
+                id,
+                lod,
+                CAST(ST_AsWKB(geom) AS BLOB) AS geometry
+            FROM counted
+            WHERE lod = 0 OR npoints < prev_npoints
         )
+        ORDER BY id, lod
+    """
+    )
+    db.execute("CREATE INDEX idx_geometry_lod_id ON division_geometry_lod(id)")
+
+    row_count = db.execute("SELECT COUNT(*) FROM division_geometry_lod").fetchone()[0]
+    logger.info(f"Geometry pyramid created with {row_count} simplified geometries")
+    return db.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
 
-        logger.info("Creating indexes for faster searches...")
 
-        # Create indexes for faster searches
-        db.execute("CREATE INDEX idx_name ON divisions_index(name)")
-        db.execute("CREATE INDEX idx_name_upper ON divisions_index(name_upper)")
-        db.execute("CREATE INDEX idx_subtype ON divisions_index(subtype)")
-        db.execute("CREATE INDEX idx_country ON divisions_index(country)")
-        db.execute("CREATE INDEX idx_id ON divisions_index(id)")
+def write_index_metadata(db, metadata: dict):
+    """Record build facts the backend reads at startup instead of recomputing them"""
+    db.execute("CREATE TABLE IF NOT EXISTS index_metadata (key VARCHAR PRIMARY KEY, value VARCHAR)")
+    for key, value in metadata.items():
+        db.execute("DELETE FROM index_metadata WHERE key = ?", [key])
+        db.execute("INSERT INTO index_metadata VALUES (?, ?)", [key, str(value)])
 
-        # Create compound index for common search patterns
-        db.execute(
-            "CREATE INDEX idx_name_subtype ON divisions_index(name_upper, subtype)"
+
+def previous_build(db_path: str) -> Optional[Dict[str, str]]:
+    """index_metadata of an existing database, or None if there is nothing to reuse"""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        with duckdb.connect(db_path, read_only=True) as db:
+            return dict(db.execute("SELECT key, value FROM index_metadata").fetchall())
+    except Exception as e:
+        logger.warning(f"Cannot reuse existing database at {db_path}: {e}")
+        return None
+
+
+def build_divisions_index(
+    db_path: str = DEFAULT_DB_PATH,
+    source: str = DEFAULT_SOURCE,
+    with_geometry: bool = False,
+    release: str = DEFAULT_RELEASE,
+    workers: int = DEFAULT_WORKERS,
+    full: bool = False,
+    division_source: Optional[str] = None,
+):
+    """Build the divisions index and save it to a database file
+
+    When db_path already holds a build with the same geometry setting, only
+    divisions whose Overture version changed have their geometry fetched and
+    simplified again, reading just the row groups that hold them;
+    the rest of the geometry is copied from the previous build. The search,
+    spatial and hierarchy tables are rebuilt from the source every time. The
+    new database is written next to db_path and swapped in when complete.
+    The division hierarchy is read from division_source, by default the
+    type=division files next to source, and skipped if there are none.
+    """
+    try:
+        timer = StageTimer()
+        previous = None if full else previous_build(db_path)
+        # Builds from before releases were recorded have no version column to diff on
+        incremental = (
+            previous is not None
+            and "release" in previous
+            and previous.get("with_geometry") == str(with_geometry)
         )
 
-        row_count = db.execute("SELECT COUNT(*) FROM divisions_index").fetchone()[0]
+        build_path = f"{db_path}.new"
+        if os.path.exists(build_path):
+            os.remove(build_path)
+        db = duckdb.connect(build_path)
         logger.info(
-            f"Lightweight divisions index created successfully with {row_count} entries and 6 indexes"
+            f"Building release {release} into {build_path} "
+            f"({'incremental from ' + previous['release'] if incremental else 'full build'})"
         )
 
-        # Get database file size
-        file_size = os.path.getsize(db_path) / (1024 * 1024)  # Size in MB
-        logger.info(f"Database file size: {file_size:.1f} MB (without geometry data)")
+        with timer.stage("extensions"):
+            # Install required extensions
+            db.execute("INSTALL spatial;")
+            db.execute("LOAD spatial;")
+            # Keep Overture geometry as WKB BLOBs, which is what the geometry
+            # store holds, instead of converting GeoParquet columns on read
+            db.execute("SET GLOBAL enable_geoparquet_conversion = false;")
+
+            if _is_remote(source):
+                db.execute("INSTALL httpfs;")
+                db.execute("LOAD httpfs;")
+
+                # Configure AWS settings for accessing Overture data, globally
+                # so the parallel load cursors inherit them
+                db.execute("SET GLOBAL s3_region='us-west-2';")
+                db.execute("SET GLOBAL s3_access_key_id='';")
+                db.execute("SET GLOBAL s3_secret_access_key='';")
+
+            if incremental:
+                db.execute(f"ATTACH {_sql_string(db_path)} AS previous (READ_ONLY)")
+
+        with timer.stage("discover") as stage:
+            partitions = partition_files(list_source_files(db, source), workers)
+            stage["files"] = sum(len(partition) for partition in partitions)
+            logger.info(
+                f"Reading {stage['files']} parquet files from {source} "
+                f"in {len(partitions)} partitions"
+            )
+
+        with timer.stage("load") as stage:
+            load_divisions(db, partitions)
+            stage["rows"] = db.execute("SELECT COUNT(*) FROM divisions_staging").fetchone()[0]
+
+        division_source = division_source or division_source_for(source)
+        with_hierarchy = False
+        if division_source:
+            try:
+                division_files = list_source_files(db, division_source)
+            except Exception as e:
+                logger.warning(f"Skipping the division hierarchy: {e}")
+            else:
+                with timer.stage("hierarchy") as stage:
+                    load_division_parents(db, partition_files(division_files, workers))
+                    stage["rows"] = build_hierarchy(db)
+                with_hierarchy = True
+        else:
+            logger.warning(
+                f"No division files known for {source}, skipping the division hierarchy"
+            )
+
+        with timer.stage("divisions_index") as stage:
+            # The "<state>, <country>" label is copied onto every division so
+            # search results show it without joining the hierarchy
+            if with_hierarchy:
+                region_label = "labels.region_label"
+                labels_join = "LEFT JOIN division_region_labels labels USING (division_id)"
+            else:
+                region_label, labels_join = "CAST(NULL AS VARCHAR)", ""
+
+            # Lightweight table with just search metadata and IDs, sorted by
+            # name so prefix searches only touch a few row groups
+            db.execute(
+                f"""
+                CREATE TABLE divisions_index AS
+                SELECT
+                    id, name, name_upper, subtype, common_name, country, bbox, version,
+                    {importance_expression()} AS importance,
+                    {region_label} AS region_label
+                FROM divisions_staging
+                {labels_join}
+                ORDER BY name_upper
+            """
+            )
+            if incremental and with_geometry:
+                # Where each division sits in the source, so changed geometry
+                # is only read from the row groups that hold it
+                db.execute(
+                    """
+                    CREATE TABLE division_source_rows AS
+                    SELECT id, filename, file_row_number FROM divisions_staging
+                """
+                )
+            db.execute("DROP TABLE divisions_staging")
+            if with_hierarchy:
+                db.execute("DROP TABLE division_region_labels")
 
+            # Create indexes for faster searches
+            db.execute("CREATE INDEX idx_name ON divisions_index(name)")
+            db.execute("CREATE INDEX idx_name_upper ON divisions_index(name_upper)")
+            db.execute("CREATE INDEX idx_subtype ON divisions_index(subtype)")
+            db.execute("CREATE INDEX idx_country ON divisions_index(country)")
+            db.execute("CREATE INDEX idx_id ON divisions_index(id)")
+
+            # Create compound index for common search patterns
+            db.execute(
+                "CREATE INDEX idx_name_subtype ON divisions_index(name_upper, subtype)"
+            )
+
+            row_count = db.execute("SELECT COUNT(*) FROM divisions_index").fetchone()[0]
+            stage["rows"] = row_count
+
+        changed_rows = row_count
+        deleted_rows = 0
+        if incremental:
+            with timer.stage("diff"):
+                # Overture bumps a feature's version whenever its geometry or
+                # attributes change, so new or re-versioned ids are the changes
+                db.execute(
+                    """
+                    CREATE TABLE divisions_changed AS
+                    SELECT id FROM divisions_index n
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM previous.divisions_index p
+                        WHERE p.id = n.id AND p.version = n.version
+                    )
+                """
+                )
+                changed_rows = db.execute("SELECT COUNT(*) FROM divisions_changed").fetchone()[0]
+                deleted_rows = db.execute(
+                    """
+                    SELECT COUNT(*) FROM previous.divisions_index
+                    WHERE id NOT IN (SELECT id FROM divisions_index)
+                """
+                ).fetchone()[0]
+                logger.info(
+                    f"{changed_rows} divisions new or changed and {deleted_rows} removed "
+                    f"since release {previous['release']}"
+                )
+
+        with timer.stage("name_index") as stage:
+            build_name_index(db)
+            stage["rows"] = row_count
+
+        with timer.stage("spatial_index") as stage:
+            build_spatial_index(db)
+            stage["rows"] = row_count
+
+        if with_geometry:
+            with timer.stage("geometry_store") as stage:
+                stage["rows"] = build_geometry_store(db, partitions, incremental)
+            with timer.stage("geometry_lods") as stage:
+                stage["rows"] = build_geometry_lods(db, incremental=incremental)
+            db.execute("DROP TABLE division_geometry_fetched")
+
+        if incremental:
+            if with_geometry:
+                db.execute("DROP TABLE division_source_rows")
+            db.execute("DROP TABLE divisions_changed")
+            db.execute("DETACH previous")
+
+        write_index_metadata(
+            db,
+            {
+                "row_count": row_count,
+                "release": release,
+                "previous_release": previous.get("release", "") if incremental else "",
+                "build_mode": "incremental" if incremental else "full",
+                "changed_rows": changed_rows,
+                "deleted_rows": deleted_rows,
+                "source": source,
+                "with_geometry": with_geometry,
+                "with_hierarchy": with_hierarchy,
+                "built_at": datetime.now(timezone.utc).isoformat(),
+                "duckdb_version": duckdb.__version__,
+                "stage_timings": json.dumps(timer.timings),
+            },
+        )
         db.close()
+
+        # Swap the finished database in; a stale WAL would otherwise be
+        # replayed against the new file
+        if os.path.exists(f"{db_path}.wal"):
+            os.remove(f"{db_path}.wal")
+        os.replace(build_path, db_path)
+
+        # Get database file size
+        file_size = os.path.getsize(db_path) / (1024 * 1024)  # Size in MB
         logger.info(
-            "Lightweight index build complete! Geometry will be fetched on-demand."
+            f"Database file size: {file_size:.1f} MB "
+            f"({'with' if with_geometry else 'without'} geometry data)"
         )
+        logger.info(
+            "Stage timings: "
+            + ", ".join(
+                f"{name}={stats['seconds']:.1f}s" for name, stats in timer.timings.items()
+            )
+        )
+
+        if with_geometry:
+            logger.info("Index build complete! Geometry is served from the local store.")
+        else:
+            logger.info(
+                "Lightweight index build complete! Geometry will be fetched on-demand."
+            )
 
     except Exception as e:
         logger.error(f"Failed to build index: {e}")
         raise
 
 
+def parse_args():
+    """Parse command line options for the index build"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--db-path",
+        default=os.environ.get("DUCKDB_PATH", DEFAULT_DB_PATH),
+        help="DuckDB file to build, updated incrementally if it already holds a build",
+    )
+    parser.add_argument(
+        "--release",
+        default=os.environ.get("OVERTURE_RELEASE", DEFAULT_RELEASE),
+        help="Overture release to build, recorded in the index metadata",
+    )
+    parser.add_argument(
+        "--source",
+        default=os.environ.get("OVERTURE_SOURCE"),
+        help="division_area parquet path or glob (S3 or local), defaults to the release on S3",
+    )
+    parser.add_argument(
+        "--division-source",
+        help="division parquet path or glob for the hierarchy, defaults to type=division next to the source",
+    )
+    parser.add_argument(
+        "--with-geometry",
+        action="store_true",
+        help="also materialize geometry and its simplified levels into local tables",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("BUILD_WORKERS", DEFAULT_WORKERS)),
+        help="parallel partitions to split the parquet files into",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="rebuild everything instead of reusing an existing build",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    build_divisions_index()
+    args = parse_args()
+    build_divisions_index(
+        args.db_path,
+        args.source or source_for_release(args.release),
+        args.with_geometry,
+        args.release,
+        args.workers,
+        args.full,
+        args.division_source,
+    )
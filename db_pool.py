@@ -0,0 +1,81 @@
+"""
+Pool of DuckDB cursors so concurrent Flask request threads never share a connection
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout"""
+
+
+class ConnectionPool:
+    """Fixed-size pool of cursors duplicated from one DuckDB connection
+
+    Each cursor is an independent connection to the same database instance, so
+    queries from different threads run concurrently instead of contending for a
+    single connection object.
+    """
+
+    def __init__(self, connection, size: int = 4, timeout: float = 10.0):
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(connection.cursor())
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a cursor for the duration of the with block"""
+        start = time.monotonic()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.waits += 1
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self.timeouts += 1
+                raise PoolTimeout(
+                    f"No database connection available after {self.timeout}s"
+                )
+
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.wait_seconds += time.monotonic() - start
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._idle.put(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Saturation metrics for the health endpoint"""
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "saturation": round(self.in_use / self.size, 4) if self.size else 0.0,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_seconds * 1000 / self.checkouts, 3)
+                if self.checkouts
+                else 0.0,
+            }
@@ -0,0 +1,91 @@
+"""
+Streaming export of division shapes as GeoJSON, GeoParquet or FlatGeobuf
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterator, Tuple
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    "geojson": ("application/geo+json", "geojson"),
+    "geoparquet": ("application/vnd.apache.parquet", "parquet"),
+    "flatgeobuf": ("application/octet-stream", "fgb"),
+}
+
+# Properties written for every exported feature, in the order they are selected
+EXPORT_PROPERTIES = ("id", "name", "subtype", "country")
+
+# GeoParquet 1.0 column metadata for the WKB geometry column. CRS is left out,
+# which GeoParquet reads as OGC:CRS84 (lon/lat WGS84), as Overture stores it.
+GEOPARQUET_METADATA = {
+    "version": "1.0.0",
+    "primary_column": "geometry",
+    "columns": {"geometry": {"encoding": "WKB", "geometry_types": []}},
+}
+
+# Small row groups keep DuckDB from buffering many large polygons per group
+EXPORT_ROW_GROUP_SIZE = 1024
+
+# Bytes read per chunk when streaming a written export file
+EXPORT_CHUNK_BYTES = 1024 * 1024
+
+# Where export files are written before being streamed
+EXPORT_TMP_DIR = os.environ.get("EXPORT_TMP_DIR") or None
+
+
+def copy_options(export_format: str) -> str:
+    """DuckDB COPY options writing a file export format"""
+    if export_format == "geoparquet":
+        # The geometry column is plain WKB, so the `geo` key that makes the
+        # file GeoParquet is written here rather than left to the extension
+        geo = json.dumps(GEOPARQUET_METADATA).replace("'", "''")
+        return (
+            f"FORMAT PARQUET, COMPRESSION ZSTD, ROW_GROUP_SIZE {EXPORT_ROW_GROUP_SIZE}, "
+            f"KV_METADATA {{geo: '{geo}'}}"
+        )
+    # Without a spatial index the FlatGeobuf driver writes features as they
+    # arrive instead of holding them all to sort at the end
+    return "FORMAT GDAL, DRIVER 'FlatGeobuf', LAYER_CREATION_OPTIONS 'SPATIAL_INDEX=NO'"
+
+
+def export_path(export_format: str) -> str:
+    """Fresh path in its own temporary directory for a file export"""
+    directory = tempfile.mkdtemp(prefix="export-", dir=EXPORT_TMP_DIR)
+    return os.path.join(directory, f"divisions.{EXPORT_FORMATS[export_format][1]}")
+
+
+def stream_file(path: str) -> Iterator[bytes]:
+    """Yield a written export in chunks, removing it once sent or abandoned"""
+    try:
+        with open(path, "rb") as handle:
+            while True:
+                chunk = handle.read(EXPORT_CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+    finally:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def geojson_collection(rows: Iterator[Tuple]) -> Iterator[str]:
+    """FeatureCollection text, one feature per row of properties plus GeoJSON geometry
+
+    The geometry text from DuckDB is spliced in without being decoded.
+    """
+    yield '{"type":"FeatureCollection","features":['
+    for index, row in enumerate(rows):
+        properties = dict(zip(EXPORT_PROPERTIES, row))
+        yield (
+            ("," if index else "")
+            + f'{{"type":"Feature","id":{json.dumps(row[0])},'
+            + f'"properties":{json.dumps(properties)},"geometry":{row[-1]}}}'
+        )
+    yield "]}"
+
+
+def write_geojson(path: str, rows: Iterator[Tuple]):
+    """Write the FeatureCollection of rows to path as it is generated"""
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.writelines(geojson_collection(rows))
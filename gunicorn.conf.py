@@ -0,0 +1,35 @@
+"""
+Gunicorn settings for the production server
+
+The app is imported once in the master and forked into the workers. DuckDB is
+not fork-safe, so the master defers connecting and every worker opens the index
+read-only after the fork, sharing the file through the OS page cache.
+"""
+import os
+
+os.environ.setdefault("DUCKDB_DEFER_CONNECT", "1")
+os.environ.setdefault("DUCKDB_READ_ONLY", "1")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 4000)}"
+preload_app = True
+
+# One process per CPU on the fly.io VM, each serving requests on a thread pool
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+os.environ.setdefault("DUCKDB_POOL_SIZE", str(threads))
+# Leave at least half the request threads free while geometry fetches are slow
+os.environ.setdefault("GEOMETRY_MAX_WAITING", str(max(1, threads // 2)))
+
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    """Connect to the index and warm up the worker before it accepts requests"""
+    from backend import overture_service
+
+    overture_service.setup_database()
+    overture_service.warm_up()
@@ -0,0 +1,233 @@
+"""
+Per-request timing spans, latency histograms and a Prometheus text exposition
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+slow_query_logger = logging.getLogger("slow_query")
+
+# Seconds; roughly doubling from sub-millisecond cache hits to remote reads
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 5, 10, 20)
+
+# DuckDB statements slower than this are logged with their plan; unset disables it
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 0)) or None
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label set"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(key + (('le', repr(float(bound))),))} {cumulative:g}"
+            yield f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {series[-1]:g}"
+            yield f"{self.name}_sum{_format_labels(key)} {series[-2]:.6f}"
+            yield f"{self.name}_count{_format_labels(key)} {series[-1]:g}"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by endpoint and query type",
+    LATENCY_BUCKETS,
+)
+SPAN_DURATION = Histogram(
+    "request_span_duration_seconds",
+    "Time spent in each phase of a request",
+    LATENCY_BUCKETS,
+)
+SEARCH_RESULTS = Histogram(
+    "search_result_count", "Results returned per search", COUNT_BUCKETS
+)
+GEOMETRY_BYTES = Histogram(
+    "geometry_response_bytes", "GeoJSON bytes per geometry response", BYTES_BUCKETS
+)
+HISTOGRAMS = (REQUEST_DURATION, SPAN_DURATION, SEARCH_RESULTS, GEOMETRY_BYTES)
+
+
+class RequestTimer:
+    """Spans and labels collected while one request is handled
+
+    Single-flight workers share the timer of the request that started them
+    and may still be running after that request timed out, so writes go
+    through a lock and are dropped once the request has finished.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.monotonic()
+        self.spans: Dict[str, float] = {}
+        self.labels: Dict[str, str] = {}
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float):
+        with self._lock:
+            if not self.finished:
+                self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def set_label(self, name: str, value: str):
+        with self._lock:
+            if not self.finished:
+                self.labels[name] = value
+
+    def finish(self) -> Tuple[Dict[str, float], Dict[str, str]]:
+        """Stop recording and return the final spans and labels"""
+        with self._lock:
+            self.finished = True
+            return dict(self.spans), dict(self.labels)
+
+
+_current_timer: contextvars.ContextVar = contextvars.ContextVar(
+    "request_timer", default=None
+)
+
+
+def start_request(endpoint: str):
+    """Begin timing a request on the current thread/context"""
+    _current_timer.set(RequestTimer(endpoint))
+
+
+def finish_request() -> Optional[RequestTimer]:
+    """Record the current request into the histograms and stop timing it"""
+    timer = _current_timer.get()
+    if timer is None:
+        return None
+    _current_timer.set(None)
+    spans, labels = timer.finish()
+    REQUEST_DURATION.observe(
+        time.monotonic() - timer.start, endpoint=timer.endpoint, **labels
+    )
+    for name, seconds in spans.items():
+        SPAN_DURATION.observe(seconds, endpoint=timer.endpoint, span=name)
+    return timer
+
+
+def label(name: str, value: Any):
+    """Attach a query-type label to the current request's latency"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.set_label(name, str(value).lower() if isinstance(value, bool) else str(value))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a phase of the current request; a no-op outside requests"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        timer.add_span(name, time.monotonic() - start)
+
+
+def timed_fetch(conn, sql: str, params: list, many: bool = True) -> Any:
+    """Execute a statement inside a "duckdb" span, logging its plan if slow"""
+    start = time.monotonic()
+    with span("duckdb"):
+        result = conn.execute(sql, params)
+        rows = result.fetchall() if many else result.fetchone()
+    elapsed_ms = (time.monotonic() - start) * 1000
+    if SLOW_QUERY_MS is not None and elapsed_ms >= SLOW_QUERY_MS:
+        log_slow_query(conn, sql, params, elapsed_ms)
+    return rows
+
+
+def log_slow_query(conn, sql: str, params: list, elapsed_ms: float):
+    """Log a slow statement with its parameters and DuckDB physical plan"""
+    try:
+        plan = "\n".join(row[1] for row in conn.execute(f"EXPLAIN {sql}", params).fetchall())
+    except Exception as e:
+        plan = f"(plan unavailable: {e})"
+    slow_query_logger.warning(
+        f"Slow query ({elapsed_ms:.1f}ms): {' '.join(sql.split())}\n"
+        f"params: {params}\n{plan}"
+    )
+
+
+def count_bucket(count: int) -> str:
+    """Coarse result-count label, keeping label cardinality small"""
+    if count == 0:
+        return "0"
+    if count < 10:
+        return "1-9"
+    return "10+"
+
+
+def size_bucket(size: int) -> str:
+    """Coarse byte-size label, keeping label cardinality small"""
+    for bound, name in ((10_000, "<10KB"), (100_000, "10-100KB"), (1_000_000, "100KB-1MB")):
+        if size < bound:
+            return name
+    return ">=1MB"
+
+
+def render(gauges: Optional[Dict[str, Any]] = None) -> str:
+    """Prometheus text exposition of the histograms plus flattened numeric gauges"""
+    lines: List[str] = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, value in _flatten(gauges or {}):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def _flatten(values: Dict[str, Any], prefix: str = "overture") -> Iterator[Tuple[str, float]]:
+    """(metric name, value) for every numeric leaf of a nested stats dict"""
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, name)
+        elif isinstance(value, bool):
+            yield name, float(value)
+        elif isinstance(value, (int, float)):
+            yield name, float(value)
@@ -0,0 +1,251 @@
+"""
+Nominatim client for the search fallback: pooled session, on-disk response cache,
+token-bucket rate limit and circuit breaker
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "DivisionShapeViewer/1.0 (https://github.com/your-repo)"
+
+
+class NominatimUnavailable(Exception):
+    """Raised instead of calling Nominatim while the breaker is open or rate limited"""
+
+
+class TokenBucket:
+    """Allow `rate` calls per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available, without waiting"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class CircuitBreaker:
+    """Stop calling a failing service, then let one trial call through after a pause
+
+    closed: calls pass, consecutive failures are counted.
+    open: calls are refused until reset_timeout has passed.
+    half-open: one trial call passes; success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be made now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half-open"
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def cancel(self):
+        """Hand back a call allowed by allow() that was not made after all"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(
+                        f"Nominatim circuit opened after {self.failures} failures"
+                    )
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ResponseStore:
+    """Persistent key/value cache of JSON responses in a SQLite file
+
+    SQLite handles locking between gunicorn workers sharing the file. The
+    connection is opened on first use so it is never inherited across a fork.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY, value TEXT, stored_at REAL
+                )
+            """
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT value FROM responses WHERE key = ? AND stored_at > ?",
+                    [key, time.time() - self.ttl_seconds],
+                )
+                .fetchone()
+            )
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                [key, json.dumps(value), time.time()],
+            )
+            conn.commit()
+
+
+class NominatimClient:
+    """Cached, rate-limited and circuit-broken access to the Nominatim search API"""
+
+    def __init__(
+        self,
+        url: str = DEFAULT_NOMINATIM_URL,
+        cache_path: Optional[str] = None,
+        cache_ttl_seconds: float = 7 * 24 * 3600,
+        rate: float = 1.0,
+        burst: float = 1.0,
+        timeout: float = 5.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+    ):
+        self.url = url
+        self.timeout = timeout
+        self.store = ResponseStore(cache_path, cache_ttl_seconds) if cache_path else None
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # Keep-alive connections are reused across fallback searches
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=8))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=8))
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cache_hits = 0
+        self.rate_limited = 0
+        self.short_circuited = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> "NominatimClient":
+        """Client configured from NOMINATIM_* environment variables"""
+        return cls(
+            url=os.environ.get("NOMINATIM_URL", DEFAULT_NOMINATIM_URL),
+            cache_path=os.environ.get("NOMINATIM_CACHE_PATH", "./nominatim_cache.sqlite3")
+            or None,
+            rate=float(os.environ.get("NOMINATIM_RATE", 1.0)),
+            burst=float(os.environ.get("NOMINATIM_BURST", 1.0)),
+            timeout=float(os.environ.get("NOMINATIM_TIMEOUT", 5.0)),
+            failure_threshold=int(os.environ.get("NOMINATIM_FAILURE_THRESHOLD", 3)),
+            reset_timeout=float(os.environ.get("NOMINATIM_RESET_TIMEOUT", 30.0)),
+        )
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GeoJSON search response for params, from the cache when possible"""
+        key = json.dumps(params, sort_keys=True)
+        if self.store:
+            try:
+                cached = self.store.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Nominatim cache read failed: {e}")
+                cached = None
+            if cached is not None:
+                self._count("cache_hits")
+                return cached
+
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise NominatimUnavailable("Nominatim circuit is open")
+        if not self.bucket.try_acquire():
+            self.breaker.cancel()
+            self._count("rate_limited")
+            raise NominatimUnavailable("Nominatim rate limit reached")
+
+        self._count("calls")
+        try:
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+        if self.store:
+            try:
+                self.store.set(key, data)
+            except sqlite3.Error as e:
+                logger.warning(f"Nominatim cache write failed: {e}")
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        """Fallback traffic metrics for the health endpoint"""
+        with self._lock:
+            return {
+                "circuit": self.breaker.state,
+                "calls": self.calls,
+                "cache_hits": self.cache_hits,
+                "rate_limited": self.rate_limited,
+                "short_circuited": self.short_circuited,
+                "failures": self.failures,
+            }
@@ -0,0 +1,178 @@
+"""
+Background prefetch of search result geometries into the response cache
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from single_flight import Overloaded, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Map size assumed when a search does not send its viewport size
+DEFAULT_VIEWPORT_PIXELS = (1024, 768)
+
+# Prefetched geometries not requested within this many seconds count as wasted
+PREFETCH_WINDOW_SECONDS = 300
+
+# Upper bound on prefetched keys remembered while waiting for a request
+MAX_TRACKED_KEYS = 10_000
+
+
+def fit_zoom(bbox: Dict[str, float], viewport: Tuple[int, int]) -> int:
+    """Zoom at which Leaflet's getBoundsZoom fits bbox into a viewport of that many pixels
+
+    Both axes are measured in Web Mercator and the result is snapped down to
+    a whole zoom, as the frontend does before requesting a geometry.
+    """
+
+    def mercator_y(lat: float) -> float:
+        lat = max(-85.0511, min(85.0511, lat))
+        return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) / (2 * math.pi)
+
+    width = max(bbox["xmax"] - bbox["xmin"], 1e-9) / 360 * 256
+    height = max(mercator_y(bbox["ymax"]) - mercator_y(bbox["ymin"]), 1e-9) * 256
+    scale = min(viewport[0] / width, viewport[1] / height)
+    return max(0, math.floor(math.log2(scale)))
+
+
+class GeometryPrefetcher:
+    """Warm the cache with the geometries a search's first results will need
+
+    Fetches run on their own small SingleFlight, so they never take workers
+    or pending slots from user geometry requests, and are dropped rather than
+    queued when it is full. A user request for a key still being prefetched
+    waits on that fetch instead of starting another. Each prefetched key is
+    remembered until it is requested (a hit) or it ages out or is pushed out
+    unrequested (wasted).
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, Optional[float], Hashable], Optional[str]],
+        is_cached: Callable[[Hashable], bool],
+        count: int = 0,
+        workers: int = 1,
+        max_pending: int = 20,
+        window_seconds: float = PREFETCH_WINDOW_SECONDS,
+    ):
+        self.fetch = fetch
+        self.is_cached = is_cached
+        self.count = count
+        self.window_seconds = window_seconds
+        self.flights = SingleFlight(workers=workers, max_pending=max_pending)
+        self._lock = threading.Lock()
+        # key -> (time prefetched, bytes)
+        self._prefetched: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self.scheduled = 0
+        self.already_cached = 0
+        self.dropped = 0
+        self.fetched = 0
+        self.fetched_bytes = 0
+        self.hits = 0
+        self.joined = 0
+        self.wasted = 0
+        self.wasted_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.count > 0
+
+    def schedule(self, jobs: List[Tuple[Hashable, str, Optional[float]]]):
+        """Prefetch (cache key, division id, tolerance) jobs in the background"""
+        for key, division_id, tolerance in jobs[: self.count]:
+            if self.is_cached(key):
+                self._count("already_cached")
+                continue
+            try:
+                # An empty context keeps the fetch's timing spans out of the
+                # search request that scheduled it
+                future = contextvars.Context().run(
+                    self.flights.submit, key, self._run, key, division_id, tolerance
+                )
+            except Overloaded:
+                self._count("dropped")
+                continue
+            with self._lock:
+                self.scheduled += 1
+                self._in_flight[key] = future
+            future.add_done_callback(lambda done, key=key: self._forget(key, done))
+
+    def _run(self, key: Hashable, division_id: str, tolerance: Optional[float]):
+        try:
+            geometry_json = self.fetch(division_id, tolerance, key)
+        except Exception as e:
+            logger.warning(f"Geometry prefetch failed for {division_id}: {e}")
+            return None
+        if geometry_json:
+            with self._lock:
+                self.fetched += 1
+                self.fetched_bytes += len(geometry_json)
+                self._prefetched[key] = (time.monotonic(), len(geometry_json))
+                self._prefetched.move_to_end(key)
+                self._expire()
+        return geometry_json
+
+    def _forget(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _expire(self):
+        """Count prefetched keys that aged out or overflowed as wasted; lock held"""
+        cutoff = time.monotonic() - self.window_seconds
+        while self._prefetched:
+            key, (prefetched_at, size) = next(iter(self._prefetched.items()))
+            if prefetched_at >= cutoff and len(self._prefetched) <= MAX_TRACKED_KEYS:
+                break
+            del self._prefetched[key]
+            self.wasted += 1
+            self.wasted_bytes += size
+
+    def in_flight(self, key: Hashable) -> Optional[Future]:
+        """The running prefetch for key, if there is one
+
+        The caller waits on it and then claims the key, so a request that
+        arrives mid-fetch counts as a hit and, separately, as joined.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.joined += 1
+            return future
+
+    def claim(self, key: Hashable):
+        """Record a geometry request, counting a hit if key was prefetched"""
+        with self._lock:
+            if self._prefetched.pop(key, None) is not None:
+                self.hits += 1
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Prefetch effectiveness metrics for the health endpoint"""
+        with self._lock:
+            self._expire()
+            return {
+                "enabled": self.enabled,
+                "count": self.count,
+                "scheduled": self.scheduled,
+                "already_cached": self.already_cached,
+                "dropped": self.dropped,
+                "fetched": self.fetched,
+                "fetched_bytes": self.fetched_bytes,
+                "hits": self.hits,
+                "joined": self.joined,
+                "pending_use": len(self._prefetched),
+                "wasted": self.wasted,
+                "wasted_bytes": self.wasted_bytes,
+                "hit_rate": round(self.hits / self.fetched, 4) if self.fetched else 0.0,
+            }
@@ -1,9 +1,16 @@
+// Pause in typing before suggestions are requested, and the shortest prefix
+// worth suggesting for
+const AUTOCOMPLETE_DEBOUNCE_MS = 150;
+const AUTOCOMPLETE_MIN_CHARS = 2;
+
 class DivisionShapeViewer {
     constructor() {
         this.map = null;
         this.currentLayer = null;
         this.searchResults = [];
         this.selectedArea = null;
+        this.autocompleteTimer = null;
+        this.autocompleteController = null;
         this.init();
     }
 
@@ -55,6 +62,7 @@ class DivisionShapeViewer {
                 this.performSearch();
             }
         });
+        searchInput.addEventListener('input', () => this.scheduleAutocomplete(searchInput.value.trim()));
 
         saveBtn.addEventListener('click', () => this.saveAsImage());
         printBtn.addEventListener('click', () => this.printMap());
@@ -62,9 +70,54 @@ class DivisionShapeViewer {
         toggleBackgroundBtn.addEventListener('click', () => this.toggleMapBackground());
     }
 
+    scheduleAutocomplete(prefix) {
+        // Debounce keystrokes so only a pause in typing sends a request
+        clearTimeout(this.autocompleteTimer);
+        this.autocompleteTimer = setTimeout(() => this.fetchSuggestions(prefix), AUTOCOMPLETE_DEBOUNCE_MS);
+    }
+
+    cancelAutocomplete() {
+        clearTimeout(this.autocompleteTimer);
+        if (this.autocompleteController) {
+            this.autocompleteController.abort();
+            this.autocompleteController = null;
+        }
+    }
+
+    async fetchSuggestions(prefix) {
+        // Abort the previous request so a slow, stale response never replaces newer suggestions
+        this.cancelAutocomplete();
+        const suggestionsList = document.getElementById('searchSuggestions');
+        if (prefix.length < AUTOCOMPLETE_MIN_CHARS) {
+            suggestionsList.replaceChildren();
+            return;
+        }
+
+        const controller = new AbortController();
+        this.autocompleteController = controller;
+        try {
+            const response = await fetch(`/api/autocomplete?q=${encodeURIComponent(prefix)}`, {
+                signal: controller.signal
+            });
+            if (!response.ok) return;
+            const suggestions = await response.json();
+            suggestionsList.replaceChildren(...suggestions.map(suggestion => {
+                const option = document.createElement('option');
+                option.value = suggestion.name;
+                option.label = `${suggestion.name} (${suggestion.subtype})`;
+                return option;
+            }));
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.warn('Autocomplete failed:', error);
+            }
+        }
+    }
+
     async performSearch() {
         const query = document.getElementById('searchInput').value.trim();
         if (!query) return;
+        this.cancelAutocomplete();
 
         this.showLoading();
         
@@ -103,7 +156,13 @@ class DivisionShapeViewer {
             body: JSON.stringify({
                 query: query,
                 filters: filters,
-                bbox: bbox
+                bbox: bbox,
+                // Substring match by default; word starts are a range scan on the
+                // sorted name terms index, but miss matches inside a word
+                mode: document.getElementById('wordStartFilter').checked ? 'word' : 'scan',
+                ranking: 'relevance',
+                // Lets the server prefetch geometries at the zoom they will be shown at
+                viewport: { width: this.map.getSize().x, height: this.map.getSize().y }
             })
         });
         
@@ -135,8 +194,12 @@ class DivisionShapeViewer {
         headerItem.innerHTML = `
             <div style="padding: 10px; background-color: #f5f5f5; border-radius: 4px; margin-bottom: 10px; font-size: 14px; color: #666;">
                 <strong>${results.length}</strong> result${results.length !== 1 ? 's' : ''} found within visible map area
+                <button class="show-all-btn" style="margin-left: 10px;">Show all on map</button>
+                <button class="export-btn" style="margin-left: 10px;">Export GeoJSON</button>
             </div>
         `;
+        headerItem.querySelector('.show-all-btn').addEventListener('click', () => this.showAllResults());
+        headerItem.querySelector('.export-btn').addEventListener('click', () => this.exportResults());
         resultsList.appendChild(headerItem);
         
         results.forEach(result => {
@@ -184,8 +247,10 @@ class DivisionShapeViewer {
                 return;
             }
 
-            // Fetch geometry from our backend API
-            const response = await fetch(`/api/geometry/${area.id}`);
+            // Fetch geometry from our backend API, simplified for the zoom it will be shown at
+            const zoom = this.getDisplayZoom(area);
+            const query = zoom !== null ? `?zoom=${zoom}` : '';
+            const response = await fetch(`/api/geometry/${area.id}${query}`);
             
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
@@ -209,6 +274,114 @@ class DivisionShapeViewer {
         }
     }
 
+    async showAllResults() {
+        // Fetch every result's geometry in one batch request and draw them together
+        try {
+            this.showLoadingIndicator('Fetching geometries...');
+
+            const withGeometry = this.searchResults.filter(result => result.geometry);
+            const ids = this.searchResults.filter(result => !result.geometry).map(result => result.id);
+            const features = withGeometry.map(result => ({
+                type: 'Feature',
+                id: result.id,
+                properties: { id: result.id },
+                geometry: result.geometry
+            }));
+
+            if (ids.length > 0) {
+                const bboxes = this.searchResults.filter(result => result.bbox).map(result => result.bbox);
+                const body = { ids: ids };
+                if (bboxes.length > 0) {
+                    const bounds = L.latLngBounds(bboxes.flatMap(bbox => [
+                        [bbox.ymin, bbox.xmin],
+                        [bbox.ymax, bbox.xmax]
+                    ]));
+                    body.zoom = this.map.getBoundsZoom(bounds);
+                }
+
+                const response = await fetch('/api/geometry/batch', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify(body)
+                });
+
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+
+                const collection = await response.json();
+                features.push(...collection.features);
+            }
+
+            if (features.length === 0) {
+                throw new Error('No geometry data received');
+            }
+
+            this.selectedArea = null;
+            document.getElementById('infoPanel').style.display = 'none';
+            document.querySelectorAll('.result-item').forEach(item => {
+                item.classList.remove('selected');
+            });
+            this.displayAreaOnMap({ type: 'FeatureCollection', features: features });
+            document.getElementById('clearBtn').style.display = 'inline-block';
+        } catch (error) {
+            console.error('Error fetching geometries:', error);
+            this.showError('Failed to load geometry data. Please try again.');
+        } finally {
+            this.hideLoadingIndicator();
+        }
+    }
+
+    async exportResults() {
+        // Full-resolution shapes of the indexed results, streamed by the export endpoint
+        const ids = this.searchResults.filter(result => !result.geometry).map(result => result.id);
+        if (ids.length === 0) {
+            this.showError('These results cannot be exported.');
+            return;
+        }
+
+        try {
+            this.showLoadingIndicator('Exporting...');
+
+            const response = await fetch('/api/export', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ ids: ids, format: 'geojson' })
+            });
+
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            // Create download link
+            const url = URL.createObjectURL(await response.blob());
+            const link = document.createElement('a');
+            link.download = 'divisions.geojson';
+            link.href = url;
+            link.click();
+            URL.revokeObjectURL(url);
+        } catch (error) {
+            console.error('Error exporting results:', error);
+            this.showError('Failed to export results. Please try again.');
+        } finally {
+            this.hideLoadingIndicator();
+        }
+    }
+
+    getDisplayZoom(area) {
+        // Zoom level the map will settle on after fitting the area's bbox
+        if (!area.bbox) return null;
+        const bounds = L.latLngBounds(
+            [area.bbox.ymin, area.bbox.xmin],
+            [area.bbox.ymax, area.bbox.xmax]
+        );
+        return this.map.getBoundsZoom(bounds);
+    }
+
     displayAreaOnMap(geometry) {
         // Clear existing layer
         if (this.currentLayer) {
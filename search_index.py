@@ -0,0 +1,115 @@
+"""
+Name matching for divisions search, backed by the sorted name index from build_index.py
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+SEARCH_MODES = ("scan", "prefix", "word")
+
+# Result orderings: alphabetical, or by relevance_score
+SEARCH_RANKINGS = ("name", "relevance")
+
+# Query-time relevance boosts, added to the importance precomputed by build_index.py
+EXACT_MATCH_BOOST = 4.0
+PREFIX_MATCH_BOOST = 2.0
+VIEWPORT_BOOST = 1.0
+
+# Characters that start a new word in a name, matching build_index.build_name_index
+WORD_SEPARATORS = (" ", "-", "(", "/")
+
+# Columns every search source must expose
+SEARCH_COLUMNS = (
+    "id, name, name_upper, subtype, common_name, country, bbox, importance, region_label"
+)
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def name_source(
+    query: str, mode: str = "scan", has_terms_index: bool = True
+) -> Tuple[str, List[Any]]:
+    """Build the FROM source and parameters that match names for a search mode
+
+    - "scan": substring match with a leading-wildcard LIKE over every row
+    - "prefix": names starting with the query, as a range on the sorted name_upper
+    - "word": any word of the name starting with the query, as a range on the
+      sorted divisions_name_terms table; without that table the same match is
+      made with LIKE patterns over every row
+    """
+    query_upper = query.upper()
+
+    if mode == "word" and has_terms_index and query_upper:
+        # Terms repeat their division's columns, so the range scan over the
+        # sorted terms is the whole lookup, with no join back to divisions_index
+        return (
+            f"""(
+                SELECT DISTINCT {SEARCH_COLUMNS} FROM divisions_name_terms
+                WHERE term >= ? AND term < ?
+            )""",
+            [query_upper, prefix_upper_bound(query_upper)],
+        )
+
+    predicate, params = name_predicate(query, mode)
+    return (
+        f"""(
+            SELECT {SEARCH_COLUMNS} FROM divisions_index
+            WHERE {predicate}
+        )""",
+        params,
+    )
+
+
+def name_predicate(query: str, mode: str = "scan") -> Tuple[str, List[Any]]:
+    """Build a name_upper predicate for a search mode, for tables without a name index"""
+    query_upper = query.upper()
+
+    if mode == "prefix" and query_upper:
+        return "name_upper >= ? AND name_upper < ?", [
+            query_upper,
+            prefix_upper_bound(query_upper),
+        ]
+
+    if mode == "word" and query_upper:
+        patterns = [f"{query_upper}%"] + [
+            f"%{separator}{query_upper}%" for separator in WORD_SEPARATORS
+        ]
+        return (
+            "(" + " OR ".join("name_upper LIKE ?" for _ in patterns) + ")",
+            patterns,
+        )
+
+    return "name_upper LIKE ?", [f"%{query_upper}%"]
+
+
+def relevance_score(
+    query: str, bbox: Optional[Dict[str, float]] = None
+) -> Tuple[str, List[Any]]:
+    """Build a score expression over SEARCH_COLUMNS, higher is more relevant
+
+    Exact name matches outrank names that start with the query, which outrank
+    other matches; within those, the precomputed importance (subtype and size)
+    decides, and features centered inside the viewport get a boost.
+    """
+    query_upper = query.upper()
+    terms = [
+        "importance",
+        f"""CASE
+            WHEN name_upper = ? THEN {EXACT_MATCH_BOOST}
+            WHEN starts_with(name_upper, ?) THEN {PREFIX_MATCH_BOOST}
+            ELSE 0
+        END""",
+    ]
+    params: List[Any] = [query_upper, query_upper]
+    if bbox:
+        terms.append(
+            f"""CASE
+            WHEN (bbox['xmin'] + bbox['xmax']) / 2 BETWEEN ? AND ?
+            AND (bbox['ymin'] + bbox['ymax']) / 2 BETWEEN ? AND ?
+            THEN {VIEWPORT_BOOST}
+            ELSE 0
+        END"""
+        )
+        params += [bbox["west"], bbox["east"], bbox["south"], bbox["north"]]
+    return "(" + " + ".join(terms) + ")", params
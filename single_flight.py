@@ -0,0 +1,96 @@
+"""
+Request coalescing and a bounded executor for slow geometry work
+"""
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+
+class Overloaded(Exception):
+    """Raised when too many distinct calls are already queued or running"""
+
+
+class SingleFlight:
+    """Run calls on a bounded thread pool, sharing one call between identical keys
+
+    Concurrent submits with the same key get the same future, so a geometry
+    that several users request at once is fetched once. At most `max_pending`
+    distinct keys can be queued or running; callers wait on the future with
+    their own timeout, which frees them even when the work itself is stuck.
+    At most `max_waiting` callers can wait at once, so slow work cannot tie
+    up every request thread for the length of that timeout.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64, max_waiting: Optional[int] = None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_waiting = max_waiting
+        self.waiting = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="geometry"
+        )
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args) -> Future:
+        """Future for fn(*args), shared with any in-flight call for the same key"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            if len(self._in_flight) >= self.max_pending:
+                self.rejected += 1
+                raise Overloaded(f"{len(self._in_flight)} geometry fetches already pending")
+            self.calls += 1
+            # Run in a copy of the caller's context so request timing spans
+            # recorded by fn are attributed to the request that started it
+            future = self._executor.submit(contextvars.copy_context().run, fn, *args)
+            self._in_flight[key] = future
+        # Outside the lock: the callback runs right away if fn already finished
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    @contextmanager
+    def waiter(self) -> Iterator[None]:
+        """Count the caller as waiting for the with block; Overloaded if max_waiting already are"""
+        with self._lock:
+            if self.max_waiting is not None and self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise Overloaded(f"{self.waiting} callers already waiting on geometry fetches")
+            self.waiting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def _forget(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def record_timeout(self):
+        """Count a caller that gave up waiting"""
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Coalescing and saturation metrics for the health endpoint"""
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "max_pending": self.max_pending,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
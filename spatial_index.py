@@ -0,0 +1,85 @@
+"""
+Viewport filtering for divisions search, backed by the spatial index from build_index.py
+"""
+import logging
+from typing import Any, Dict, List, Tuple
+
+from build_index import SPATIAL_GRID_SIZE
+from search_index import SEARCH_COLUMNS, name_predicate
+
+logger = logging.getLogger(__name__)
+
+# Fraction of names assumed to survive each query character. A crude stand-in
+# for real name statistics, but it orders short against long queries correctly.
+NAME_SELECTIVITY_PER_CHAR = 0.25
+
+
+class SpatialStats:
+    """Feature density grid from divisions_spatial_grid, for viewport row estimates"""
+
+    def __init__(self, cells: List[Tuple[int, int, int]], grid_size: int = SPATIAL_GRID_SIZE):
+        self.grid_size = grid_size
+        # 2D prefix sums: _sums[y][x] is the count of all cells below y and left of x
+        self._sums = [[0] * (grid_size + 1) for _ in range(grid_size + 1)]
+        for cell_x, cell_y, row_count in cells:
+            self._sums[cell_y + 1][cell_x + 1] += row_count
+        for y in range(1, grid_size + 1):
+            for x in range(1, grid_size + 1):
+                self._sums[y][x] += (
+                    self._sums[y - 1][x] + self._sums[y][x - 1] - self._sums[y - 1][x - 1]
+                )
+        self.total_rows = self._sums[grid_size][grid_size]
+
+    @classmethod
+    def load(cls, db) -> "SpatialStats":
+        """Read the density grid written by build_index.py"""
+        cells = db.execute(
+            "SELECT cell_x, cell_y, row_count FROM divisions_spatial_grid"
+        ).fetchall()
+        return cls(cells)
+
+    def _cell(self, value: float, low: float, span: float) -> int:
+        """Grid cell index of a coordinate, clamped to the grid"""
+        index = int((value - low) / span * self.grid_size)
+        return min(self.grid_size - 1, max(0, index))
+
+    def estimate(self, bbox: Dict[str, float]) -> int:
+        """Estimate how many features have their bbox center inside the viewport"""
+        x0 = self._cell(bbox["west"], -180.0, 360.0)
+        x1 = self._cell(bbox["east"], -180.0, 360.0) + 1
+        y0 = self._cell(bbox["south"], -90.0, 180.0)
+        y1 = self._cell(bbox["north"], -90.0, 180.0) + 1
+        if x1 <= x0 or y1 <= y0:
+            return 0
+        sums = self._sums
+        return sums[y1][x1] - sums[y0][x1] - sums[y1][x0] + sums[y0][x0]
+
+
+def estimate_name_matches(total_rows: int, query: str) -> float:
+    """Heuristic number of rows a name filter keeps"""
+    return total_rows * NAME_SELECTIVITY_PER_CHAR ** len(query)
+
+
+def prefer_spatial(stats: SpatialStats, query: str, bbox: Dict[str, float]) -> bool:
+    """True when the viewport is expected to be more selective than the name filter"""
+    spatial_rows = stats.estimate(bbox)
+    name_rows = estimate_name_matches(stats.total_rows, query)
+    logger.info(
+        f"Search plan estimates: {spatial_rows} rows in viewport, {name_rows:.0f} name matches"
+    )
+    return spatial_rows < name_rows
+
+
+def spatial_source(
+    query: str, mode: str, bbox: Dict[str, float]
+) -> Tuple[str, List[Any]]:
+    """Build a FROM source that filters on the viewport first, then on the name"""
+    predicate, name_params = name_predicate(query, mode)
+    return (
+        f"""(
+            SELECT {SEARCH_COLUMNS} FROM divisions_spatial
+            WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?
+            AND {predicate}
+        )""",
+        [bbox["east"], bbox["west"], bbox["north"], bbox["south"]] + name_params,
+    )
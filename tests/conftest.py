@@ -0,0 +1,7 @@
+"""
+Make the app modules at the repository root importable from the tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,149 @@
+"""
+NominatimClient against a local stand-in for the Nominatim search API
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from nominatim import NominatimClient, NominatimUnavailable
+
+RESPONSE = {"type": "FeatureCollection", "features": []}
+
+
+class StandIn:
+    """Local HTTP server answering every request with `status`, counting requests"""
+
+    def __init__(self):
+        self.status = 200
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                body = json.dumps(RESPONSE).encode()
+                self.send_response(stand_in.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+def make_client(url: str, **options) -> NominatimClient:
+    options = {"rate": 100.0, "burst": 100.0, "timeout": 2.0, **options}
+    return NominatimClient(url=url, **options)
+
+
+def test_cache_is_shared_between_clients(stand_in, tmp_path):
+    cache_path = str(tmp_path / "nominatim.sqlite3")
+    first = make_client(stand_in.url, cache_path=cache_path)
+    second = make_client(stand_in.url, cache_path=cache_path)
+
+    assert first.search({"q": "Paris"}) == RESPONSE
+    assert second.search({"q": "Paris"}) == RESPONSE
+    assert stand_in.requests == 1
+    assert first.stats()["calls"] == 1
+    assert second.stats()["cache_hits"] == 1
+
+    second.search({"q": "Lyon"})
+    assert stand_in.requests == 2
+
+
+def test_failures_are_counted_and_open_the_circuit(stand_in):
+    stand_in.status = 500
+    client = make_client(stand_in.url, failure_threshold=3, reset_timeout=60)
+
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            client.search({"q": "Paris"})
+    assert client.stats()["failures"] == 3
+    assert client.stats()["circuit"] == "open"
+
+    with pytest.raises(NominatimUnavailable):
+        client.search({"q": "Paris"})
+    assert stand_in.requests == 3
+    assert client.stats()["short_circuited"] == 1
+
+
+def test_success_resets_the_failure_count(stand_in):
+    client = make_client(stand_in.url, failure_threshold=2)
+    stand_in.status = 500
+    with pytest.raises(requests.HTTPError):
+        client.search({"q": "Paris"})
+    stand_in.status = 200
+    client.search({"q": "Paris"})
+    stand_in.status = 500
+    with pytest.raises(requests.HTTPError):
+        client.search({"q": "Paris"})
+    assert client.stats()["circuit"] == "closed"
+
+
+def test_circuit_half_opens_then_closes(stand_in):
+    stand_in.status = 500
+    client = make_client(stand_in.url, failure_threshold=1, reset_timeout=0.2)
+    with pytest.raises(requests.HTTPError):
+        client.search({"q": "Paris"})
+    assert client.breaker.state == "open"
+
+    time.sleep(0.25)
+    # The trial call fails, so the circuit opens again
+    with pytest.raises(requests.HTTPError):
+        client.search({"q": "Paris"})
+    assert client.breaker.state == "open"
+    with pytest.raises(NominatimUnavailable):
+        client.search({"q": "Paris"})
+
+    time.sleep(0.25)
+    assert client.breaker.allow()
+    assert client.breaker.state == "half-open"
+    # Only one trial call is let through at a time
+    assert not client.breaker.allow()
+    client.breaker.cancel()
+
+    stand_in.status = 200
+    assert client.search({"q": "Paris"}) == RESPONSE
+    assert client.breaker.state == "closed"
+    assert stand_in.requests == 3
+
+
+def test_rate_limit_refuses_instead_of_queueing(stand_in):
+    client = make_client(stand_in.url, rate=1.0, burst=2.0)
+    client.search({"q": "Paris"})
+    client.search({"q": "Lyon"})
+
+    start = time.monotonic()
+    with pytest.raises(NominatimUnavailable):
+        client.search({"q": "Nice"})
+    assert time.monotonic() - start < 0.5
+    assert stand_in.requests == 2
+    assert client.stats()["rate_limited"] == 1
+    # Being rate limited is not a failure of the service
+    assert client.stats()["failures"] == 0
+    assert client.breaker.state == "closed"
+
+    time.sleep(1.05)
+    client.search({"q": "Nice"})
+    assert stand_in.requests == 3
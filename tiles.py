@@ -0,0 +1,170 @@
+"""
+Mapbox Vector Tile encoding and on-disk tile store for division boundaries
+"""
+import argparse
+import logging
+import math
+import os
+import re
+import tempfile
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    import mapbox_vector_tile
+    from shapely import clip_by_rect, wkb
+    from shapely.ops import transform
+except ImportError:  # pragma: no cover - optional dependency
+    mapbox_vector_tile = None
+
+logger = logging.getLogger(__name__)
+
+TILE_EXTENT = 4096
+
+# Clip geometries a little outside the tile so strokes do not end at tile edges
+TILE_BUFFER = 64
+
+# Skip features smaller than this many pixels at the tile's zoom
+MIN_FEATURE_PIXELS = 4
+
+MAX_LATITUDE = 85.0511287798
+
+LAYER_NAME = "divisions"
+
+
+def tiles_available() -> bool:
+    """True when the optional tile encoding dependencies are installed"""
+    return mapbox_vector_tile is not None
+
+
+def filters_from_types(types: Optional[str]) -> Dict[str, bool]:
+    """Search-style subtype filters from a comma separated ?types= value"""
+    if types is None:
+        return {}
+    requested = set(types.split(","))
+    return {name: name in requested for name in ("city", "state", "county")}
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of a web mercator tile in degrees"""
+    n = 2**z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def max_grid_level(z: int) -> int:
+    """Coarsest spatial grid_level still at least MIN_FEATURE_PIXELS wide at zoom z
+
+    A feature at grid_level L spans about 360 / 2**L degrees, which is
+    256 * 2**(z - L) pixels at zoom z.
+    """
+    return z + 8 - int(math.log2(MIN_FEATURE_PIXELS))
+
+
+def encode_tile(
+    z: int, x: int, y: int, features: Iterable[Tuple[bytes, Dict[str, Any]]]
+) -> bytes:
+    """Clip (WKB geometry, properties) pairs to a tile and encode them as MVT"""
+    n = 2**z
+    west, south, east, north = tile_bounds(z, x, y)
+    pad_x = (east - west) * TILE_BUFFER / TILE_EXTENT
+    pad_y = (north - south) * TILE_BUFFER / TILE_EXTENT
+
+    def to_tile_pixels(lon, lat):
+        lat = [max(-MAX_LATITUDE, min(MAX_LATITUDE, value)) for value in lat]
+        px = [((value + 180.0) / 360.0 * n - x) * TILE_EXTENT for value in lon]
+        py = [
+            (
+                (1 - math.asinh(math.tan(math.radians(value))) / math.pi) / 2 * n - y
+            )
+            * TILE_EXTENT
+            for value in lat
+        ]
+        return px, py
+
+    encoded_features = []
+    for geometry_wkb, properties in features:
+        geometry = clip_by_rect(
+            wkb.loads(bytes(geometry_wkb)),
+            west - pad_x,
+            south - pad_y,
+            east + pad_x,
+            north + pad_y,
+        )
+        if geometry.is_empty:
+            continue
+        encoded_features.append(
+            {
+                "geometry": transform(to_tile_pixels, geometry),
+                "properties": properties,
+            }
+        )
+
+    return mapbox_vector_tile.encode(
+        [{"name": LAYER_NAME, "features": encoded_features}],
+        default_options={"extents": TILE_EXTENT, "y_coord_down": True},
+    )
+
+
+class TileStore:
+    """Pre-generated tiles on disk, laid out as <root>/<release>/<layer key>/<z>/<x>/<y>.mvt
+
+    Tiles of each index release are kept apart, so a rebuilt index never
+    serves tiles generated from the previous one.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, release: Optional[str], key: str, z: int, x: int, y: int) -> str:
+        release_dir = re.sub(r"[^A-Za-z0-9._-]", "_", release or "unknown")
+        return os.path.join(self.root, release_dir, key, str(z), str(x), f"{y}.mvt")
+
+    def get(
+        self, release: Optional[str], key: str, z: int, x: int, y: int
+    ) -> Optional[bytes]:
+        """Read a stored tile, or None if it has not been generated"""
+        try:
+            with open(self._path(release, key, z, x, y), "rb") as tile_file:
+                return tile_file.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, release: Optional[str], key: str, z: int, x: int, y: int, data: bytes):
+        """Write a tile atomically so concurrent readers never see a partial file"""
+        path = self._path(release, key, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tile_file:
+                tile_file.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+def pregenerate(min_zoom: int, max_zoom: int, types: Optional[str] = None):
+    """Fill TILE_STORE_DIR with every tile from min_zoom to max_zoom"""
+    from backend import overture_service
+
+    if not overture_service.tile_store:
+        raise SystemExit("Set TILE_STORE_DIR to the directory tiles should be written to")
+
+    filters = filters_from_types(types)
+    for z in range(min_zoom, max_zoom + 1):
+        for x in range(2**z):
+            for y in range(2**z):
+                overture_service.get_division_tile(z, x, y, filters)
+        logger.info(f"Pre-generated {4 ** z} tiles at zoom {z}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate division vector tiles")
+    parser.add_argument("--min-zoom", type=int, default=0)
+    parser.add_argument("--max-zoom", type=int, default=5)
+    parser.add_argument("--types", help="comma separated subset of city,state,county")
+    args = parser.parse_args()
+    pregenerate(args.min_zoom, args.max_zoom, args.types)
@@ -0,0 +1,6 @@
+"""
+WSGI entry point for the production server: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from backend import app
+
+__all__ = ["app"]